@@ -0,0 +1,149 @@
+"""
+Content-addressed storage for the PDFs behind dbo.Projects.link.
+
+Uploads are streamed to a temporary file in 1 MiB chunks, hashed on the way
+in and then renamed to ``<sha256>.pdf`` (under a two-character fan-out
+directory). Uploading the same document twice keeps one copy, and the file
+behind a name never changes, so downloads can be cached forever.
+
+Downloads go through ``send_attachment``, which answers conditional and Range
+requests itself, or hands the file to the front server when
+ATTACHMENT_SENDFILE is "x-sendfile" (Apache/lighttpd) or "x-accel" (nginx,
+with ATTACHMENT_ACCEL_PREFIX mapped to ATTACHMENT_DIR as an internal location).
+Links that predate this module are plain file names in static/pdfs and are
+still served from there.
+"""
+
+import hashlib
+import os
+import re
+import tempfile
+
+from flask import current_app, request
+from werkzeug.utils import send_file
+
+ROOT = os.path.dirname(os.path.abspath(__file__))
+ATTACHMENT_DIR = os.environ.get(
+    "ATTACHMENT_DIR", os.path.join(ROOT, "instance", "attachments")
+)
+LEGACY_DIR = os.path.join(ROOT, "static", "pdfs")
+
+MAX_ATTACHMENT_BYTES = int(os.environ.get("MAX_ATTACHMENT_BYTES", 50 * 1024 * 1024))
+CHUNK_SIZE = 1024 * 1024
+
+ATTACHMENT_SENDFILE = os.environ.get("ATTACHMENT_SENDFILE", "").lower()
+ATTACHMENT_ACCEL_PREFIX = os.environ.get("ATTACHMENT_ACCEL_PREFIX", "/_attachments/")
+
+CACHE_CONTROL = "public, max-age=31536000, immutable"
+LEGACY_CACHE_CONTROL = "public, max-age=3600"
+
+_STORED_NAME = re.compile(r"^[0-9a-f]{64}\.pdf$")
+_LEGACY_NAME = re.compile(r"^[\w][\w .()-]*\.pdf$", re.IGNORECASE)
+
+
+class AttachmentError(ValueError):
+    """An upload that was rejected; ``status`` is the HTTP status to answer."""
+
+    def __init__(self, message, status=400):
+        super().__init__(message)
+        self.status = status
+
+
+def _stored_path(name):
+    return os.path.join(ATTACHMENT_DIR, name[:2], name)
+
+
+def store(stream):
+    """
+    Stream a PDF from ``stream`` into the store. Returns (name, size, created);
+    ``created`` is False when an identical file was already stored.
+    """
+    os.makedirs(ATTACHMENT_DIR, exist_ok=True)
+    digest = hashlib.sha256()
+    size = 0
+    head = b""
+    fd, temp_path = tempfile.mkstemp(dir=ATTACHMENT_DIR, suffix=".upload")
+    try:
+        with os.fdopen(fd, "wb") as f:
+            while True:
+                chunk = stream.read(CHUNK_SIZE)
+                if not chunk:
+                    break
+                if len(head) < 5:
+                    head += chunk[: 5 - len(head)]
+                    if not b"%PDF-".startswith(head):
+                        raise AttachmentError("Only PDF files can be attached", 415)
+                size += len(chunk)
+                if size > MAX_ATTACHMENT_BYTES:
+                    raise AttachmentError(
+                        f"Attachments are limited to {MAX_ATTACHMENT_BYTES} bytes", 413
+                    )
+                digest.update(chunk)
+                f.write(chunk)
+        if size == 0:
+            raise AttachmentError("The upload is empty")
+        if head != b"%PDF-":
+            raise AttachmentError("Only PDF files can be attached", 415)
+
+        name = f"{digest.hexdigest()}.pdf"
+        path = _stored_path(name)
+        if os.path.exists(path):
+            os.unlink(temp_path)
+            return name, size, False
+
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        os.replace(temp_path, path)
+        return name, size, True
+    except BaseException:
+        if os.path.exists(temp_path):
+            os.unlink(temp_path)
+        raise
+
+
+def resolve(name):
+    """(path, content-addressed?) for a link value, or (None, False) if unknown."""
+    if _STORED_NAME.match(name):
+        path = _stored_path(name)
+        return (path, True) if os.path.isfile(path) else (None, False)
+    if _LEGACY_NAME.match(name):
+        path = os.path.join(LEGACY_DIR, name)
+        return (path, False) if os.path.isfile(path) else (None, False)
+    return None, False
+
+
+def send_attachment(name, download_name=None):
+    """
+    Response for the attachment called ``name``, or None if there is none.
+    Handles If-None-Match/If-Modified-Since and Range via send_file.
+    """
+    path, immutable = resolve(name)
+    if path is None:
+        return None
+
+    environ = request.environ
+    if ATTACHMENT_SENDFILE:
+        # The front server answers Range itself once it has the file; only
+        # the 304 check happens here
+        environ = {k: v for k, v in environ.items() if k != "HTTP_RANGE"}
+
+    response = send_file(
+        path,
+        environ,
+        mimetype="application/pdf",
+        download_name=download_name or name,
+        conditional=True,
+        etag=name[:-4] if immutable else True,
+        max_age=None,
+        use_x_sendfile=bool(ATTACHMENT_SENDFILE),
+        response_class=current_app.response_class,
+    )
+    response.headers["Cache-Control"] = (
+        CACHE_CONTROL if immutable else LEGACY_CACHE_CONTROL
+    )
+
+    if ATTACHMENT_SENDFILE == "x-accel" and "X-Sendfile" in response.headers:
+        del response.headers["X-Sendfile"]
+        relative = os.path.relpath(path, ATTACHMENT_DIR if immutable else LEGACY_DIR)
+        prefix = ATTACHMENT_ACCEL_PREFIX if immutable else "/static/pdfs/"
+        response.headers["X-Accel-Redirect"] = prefix + relative.replace(os.sep, "/")
+    return response
@@ -0,0 +1,365 @@
+"""
+Load benchmark for the main routes against a seeded SQLite stand-in.
+
+    python -m bench.run --rows 1000
+    python -m bench.run --rows 100000 --clients 16 --requests 500 --output 100k.json
+    python -m bench.run --rows 1000000 --baseline 1m.json --max-regression 0.2
+
+Each size is seeded once into bench/.data/ (same data every time) and copied to
+a scratch file per run, since the write scenarios change it. The app is started
+in a child process (threaded Werkzeug, or gunicorn with ``--gunicorn``); every
+scenario is then driven by ``--clients`` concurrent clients and reported as
+p50/p95/p99 latency and throughput, followed by the server's peak RSS.
+
+With ``--baseline`` the run fails (exit status 1) when any scenario's p95 is
+more than ``--max-regression`` worse than in the baseline report.
+"""
+
+import argparse
+import itertools
+import json
+import os
+import random
+import resource
+import shlex
+import shutil
+import socket
+import statistics
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+import urllib.error
+import urllib.parse
+import urllib.request
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+
+from flask import Flask
+from flask.sessions import SecureCookieSessionInterface
+
+from bench import sqlite_backend
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+DATA_DIR = os.path.join(ROOT, "bench", ".data")
+SECRET_KEY = "bench-secret"
+
+
+class Context:
+    """State shared by the client threads of one run."""
+
+    def __init__(self, rows):
+        self.rows = rows
+        self.created = deque()
+        self.session_cookie = _session_cookie({"user_id": 1})
+
+
+def _session_cookie(data):
+    app = Flask(__name__)
+    app.secret_key = SECRET_KEY
+    serializer = SecureCookieSessionInterface().get_signing_serializer(app)
+    return f"session={serializer.dumps(data)}"
+
+
+def _project_form(rng):
+    form = {
+        "title": f"Benchmark program {rng.randrange(10**6)}",
+        "projectlocation": "Tacloban City, Leyte",
+        "leader": "Bench Leader",
+        "assistant": "Bench Assistant",
+        "members": "Ana Reyes, Ben Santos",
+        "projectdate": f"2024-{rng.randint(1, 12):02d}-{rng.randint(1, 28):02d}",
+        "duration": "3 months",
+        "projectstatus": rng.choice(sqlite_backend.STATUSES),
+        "link": "",
+        "x": f"{rng.uniform(124.3, 125.7):.6f}",
+        "y": f"{rng.uniform(10.0, 11.8):.6f}",
+        "collegecampus": rng.choice(sqlite_backend.CAMPUSES),
+    }
+    pairs = list(form.items())
+    pairs += [("sdg[]", str(goal)) for goal in rng.sample(range(1, 18), 2)]
+    return urllib.parse.urlencode(pairs).encode("ascii")
+
+
+def _add(ctx, rng):
+    return "POST", "/add-program", _project_form(rng)
+
+
+def _edit(ctx, rng):
+    return "PUT", f"/edit-program/{rng.randint(1, ctx.rows)}", _project_form(rng)
+
+
+def _delete(ctx, rng):
+    try:
+        projectid = ctx.created.popleft()
+    except IndexError:
+        return None
+    return "DELETE", f"/delete-program/{projectid}", None
+
+
+# Scenario name -> function(ctx, rng) returning (method, path, body) or None
+SCENARIOS = {
+    "dashboard": lambda ctx, rng: ("GET", "/dashboard", None),
+    "api_projects": lambda ctx, rng: ("GET", "/api/projects", None),
+    "api_projects_compact": lambda ctx, rng: (
+        "GET",
+        "/api/projects?format=compact&limit=1000",
+        None,
+    ),
+    "extension_program_management": lambda ctx, rng: (
+        "GET",
+        "/extension-program-management",
+        None,
+    ),
+    "get_program": lambda ctx, rng: (
+        "GET",
+        f"/get-program/{rng.randint(1, ctx.rows)}",
+        None,
+    ),
+    "add_program": _add,
+    "edit_program": _edit,
+    "delete_program": _delete,
+}
+
+
+def seeded_database(rows, reseed=False):
+    """Path of the seeded database for ``rows``, creating it if needed."""
+    os.makedirs(DATA_DIR, exist_ok=True)
+    path = os.path.join(DATA_DIR, f"projects-{rows}.sqlite")
+    if reseed or not os.path.exists(path):
+        if os.path.exists(path):
+            os.remove(path)
+        print(f"Seeding {rows} projects into {path} ...", flush=True)
+        started = time.perf_counter()
+        sqlite_backend.seed(path + ".tmp", rows)
+        os.replace(path + ".tmp", path)
+        print(f"Seeded in {time.perf_counter() - started:.1f}s", flush=True)
+    return path
+
+
+def _free_port():
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def start_server(database, port, gunicorn_args=None):
+    env = dict(
+        os.environ,
+        BENCH_DB=database,
+        FLASK_SECRET_KEY=SECRET_KEY,
+        LOG_LEVEL=os.environ.get("LOG_LEVEL", "WARNING"),
+        PYTHONPATH=ROOT,
+        # The User model talks to the stand-in through the SQLite dialect
+        SQLALCHEMY_DATABASE_URI="sqlite://",
+    )
+    if gunicorn_args is None:
+        command = [sys.executable, "-m", "bench.server", "--port", str(port)]
+    else:
+        command = ["gunicorn", "-b", f"127.0.0.1:{port}"]
+        command += shlex.split(gunicorn_args) + ["bench.server:app"]
+    server = subprocess.Popen(command, cwd=ROOT, env=env)
+
+    deadline = time.monotonic() + 60
+    while time.monotonic() < deadline:
+        if server.poll() is not None:
+            raise RuntimeError(f"Server exited with status {server.returncode}")
+        try:
+            urllib.request.urlopen(f"http://127.0.0.1:{port}/health", timeout=1)
+            return server
+        except OSError:
+            time.sleep(0.2)
+    server.terminate()
+    raise RuntimeError("Server did not become ready within 60s")
+
+
+def _request(base_url, ctx, method, path, body):
+    headers = {"Cookie": ctx.session_cookie, "Accept-Encoding": "gzip"}
+    if body is not None:
+        headers["Content-Type"] = "application/x-www-form-urlencoded"
+    request = urllib.request.Request(
+        base_url + path, data=body, method=method, headers=headers
+    )
+    started = time.perf_counter()
+    try:
+        with urllib.request.urlopen(request, timeout=120) as response:
+            payload = response.read()
+            status = response.status
+    except urllib.error.HTTPError as error:
+        payload = error.read()
+        status = error.code
+    return time.perf_counter() - started, status, payload
+
+
+def run_scenario(base_url, ctx, name, requests, clients, warmup, seed):
+    build = SCENARIOS[name]
+    rng = random.Random(seed)
+    rng_lock = threading.Lock()
+    for _ in range(warmup):
+        spec = build(ctx, rng)
+        if spec is not None:
+            _request(base_url, ctx, *spec)
+
+    counter = itertools.count()
+    latencies = []
+    errors = []
+    lock = threading.Lock()
+
+    def client():
+        while next(counter) < requests:
+            with rng_lock:
+                spec = build(ctx, rng)
+            if spec is None:
+                return
+            elapsed, status, payload = _request(base_url, ctx, *spec)
+            with lock:
+                latencies.append(elapsed)
+                if status >= 400:
+                    errors.append((status, payload[:300].decode("utf-8", "replace")))
+            if name == "add_program" and status < 400:
+                # Remembered for delete_program to remove
+                ctx.created.append(json.loads(payload)["projectid"])
+
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=clients) as executor:
+        for future in [executor.submit(client) for _ in range(clients)]:
+            future.result()
+    wall = time.perf_counter() - started
+
+    result = {"requests": len(latencies), "errors": len(errors)}
+    if errors:
+        result["first_error"] = f"HTTP {errors[0][0]}: {errors[0][1]}"
+    if len(latencies) >= 2:
+        cuts = statistics.quantiles(latencies, n=100, method="inclusive")
+        result.update(
+            p50_ms=round(cuts[49] * 1000, 2),
+            p95_ms=round(cuts[94] * 1000, 2),
+            p99_ms=round(cuts[98] * 1000, 2),
+            throughput_rps=round(len(latencies) / wall, 1),
+        )
+    return result
+
+
+def _peak_rss_mb():
+    peak = resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss
+    # Linux reports kilobytes, macOS bytes
+    return round(peak / (1024 * 1024 if sys.platform == "darwin" else 1024), 1)
+
+
+def compare(report, baseline, max_regression):
+    """Return a message per scenario whose p95 regressed past the threshold."""
+    regressions = []
+    for name, result in report["scenarios"].items():
+        before = baseline.get("scenarios", {}).get(name, {}).get("p95_ms")
+        after = result.get("p95_ms")
+        if before and after and after > before * (1 + max_regression):
+            regressions.append(
+                f"{name}: p95 {after}ms vs {before}ms (+{after / before - 1:.0%})"
+            )
+    return regressions
+
+
+def print_report(report):
+    print(
+        f"\n{report['rows']} rows, {report['clients']} clients"
+        f" ({'gunicorn' if report['gunicorn'] else 'werkzeug'})\n"
+    )
+    print(
+        f"{'scenario':<30}{'reqs':>7}{'errs':>6}{'p50 ms':>10}{'p95 ms':>10}"
+        f"{'p99 ms':>10}{'req/s':>9}"
+    )
+    for name, result in report["scenarios"].items():
+        print(
+            f"{name:<30}{result['requests']:>7}{result['errors']:>6}"
+            f"{result.get('p50_ms', '-'):>10}{result.get('p95_ms', '-'):>10}"
+            f"{result.get('p99_ms', '-'):>10}{result.get('throughput_rps', '-'):>9}"
+        )
+    for name, result in report["scenarios"].items():
+        if "first_error" in result:
+            print(f"  {name}: {result['first_error']}")
+    print(f"\nServer peak RSS: {report['peak_rss_mb']} MB")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter
+    )
+    parser.add_argument(
+        "--rows", type=int, default=1000, help="e.g. 1000, 100000, 1000000"
+    )
+    parser.add_argument("--clients", type=int, default=8)
+    parser.add_argument("--requests", type=int, default=200, help="per scenario")
+    parser.add_argument("--warmup", type=int, default=5, help="per scenario")
+    parser.add_argument(
+        "--scenarios", default=",".join(SCENARIOS), help="comma-separated subset"
+    )
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--reseed", action="store_true")
+    parser.add_argument(
+        "--gunicorn",
+        nargs="?",
+        const="",
+        default=None,
+        metavar="ARGS",
+        help="serve with gunicorn, passing ARGS (e.g. '-c gunicorn.conf.py')",
+    )
+    parser.add_argument("--output", help="write the report as JSON")
+    parser.add_argument("--baseline", help="JSON report to compare p95s against")
+    parser.add_argument("--max-regression", type=float, default=0.2)
+    args = parser.parse_args(argv)
+
+    names = [name.strip() for name in args.scenarios.split(",") if name.strip()]
+    unknown = [name for name in names if name not in SCENARIOS]
+    if unknown:
+        parser.error(f"unknown scenarios: {', '.join(unknown)}")
+
+    seeded = seeded_database(args.rows, args.reseed)
+    scratch = tempfile.mkdtemp(prefix="evsu-bench-")
+    database = os.path.join(scratch, "projects.sqlite")
+    shutil.copyfile(seeded, database)
+
+    port = _free_port()
+    server = start_server(database, port, args.gunicorn)
+    ctx = Context(args.rows)
+    report = {
+        "rows": args.rows,
+        "clients": args.clients,
+        "gunicorn": args.gunicorn is not None,
+        "scenarios": {},
+    }
+    try:
+        for name in names:
+            print(f"Running {name} ...", flush=True)
+            report["scenarios"][name] = run_scenario(
+                f"http://127.0.0.1:{port}",
+                ctx,
+                name,
+                args.requests,
+                args.clients,
+                args.warmup,
+                args.seed,
+            )
+    finally:
+        server.terminate()
+        server.wait()
+        shutil.rmtree(scratch, ignore_errors=True)
+
+    report["peak_rss_mb"] = _peak_rss_mb()
+    print_report(report)
+
+    if args.output:
+        with open(args.output, "w") as output:
+            json.dump(report, output, indent=2)
+
+    if args.baseline:
+        with open(args.baseline) as baseline:
+            regressions = compare(report, json.load(baseline), args.max_regression)
+        if regressions:
+            print("\nRegressions:\n  " + "\n  ".join(regressions))
+            return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
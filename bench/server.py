@@ -0,0 +1,33 @@
+"""
+login.app served against the SQLite stand-in in $BENCH_DB.
+
+Started by ``bench.run``, either directly (a threaded Werkzeug server on
+``--port``) or under gunicorn as ``bench.server:app``.
+"""
+
+import argparse
+import logging
+import os
+
+from bench import sqlite_backend
+
+sqlite_backend.install(os.environ["BENCH_DB"])
+
+from login import app  # noqa: E402
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, required=True)
+    args = parser.parse_args()
+
+    from werkzeug.serving import make_server
+
+    # One access-log line per request would dominate the measurements
+    logging.getLogger("werkzeug").setLevel(logging.WARNING)
+    make_server(args.host, args.port, app, threaded=True).serve_forever()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,404 @@
+"""
+SQLite stand-in for the Azure SQL database, for benchmarks.
+
+``install(path)`` registers a ``pyodbc`` module whose ``connect()`` opens the
+SQLite file at ``path`` (attached as schema ``dbo``), so login.py, the pool and
+every query module run unchanged. A connection string with
+``DATABASE=<file>.sqlite`` opens that file instead, e.g. a second copy standing
+in for a read replica (DB_CONN_STRING/DB_REPLICA_CONN_STRING).
+
+Statements are translated from T-SQL on the way through: ``TOP (?)`` becomes
+``LIMIT ?``, ``ISNULL`` becomes ``IFNULL``, ``OUTPUT INSERTED.col`` becomes
+``RETURNING col``, ``STRING_AGG`` becomes ``group_concat``, table hints are
+dropped, and the few statements with no SQLite equivalent (the summary MERGE,
+sequence ranges) have hand-written versions.
+
+``seed(path, rows)`` creates the schema and fills dbo.Projects with synthetic,
+deterministic data.
+"""
+
+import datetime
+import math
+import random
+import re
+import sqlite3
+import sys
+import types
+from functools import lru_cache
+
+import bulk
+import sdgs
+import summary
+
+SCHEMA = [
+    """
+    CREATE TABLE Projects (
+        projectid INTEGER PRIMARY KEY,
+        title TEXT,
+        projectlocation TEXT,
+        leader TEXT,
+        assistant TEXT,
+        members TEXT,
+        projectdate TEXT,
+        duration TEXT,
+        projectstatus TEXT,
+        link TEXT,
+        x REAL,
+        y REAL,
+        sdg TEXT,
+        collegecampus TEXT,
+        projectdate_value TEXT,
+        projectyear INTEGER
+            GENERATED ALWAYS AS (CAST(substr(projectdate_value, 1, 4) AS INTEGER))
+            VIRTUAL
+    )
+    """,
+    "CREATE INDEX IX_Projects_y_x ON Projects (y, x, title)",
+    "CREATE INDEX IX_Projects_projectyear ON Projects (projectyear)",
+    "CREATE INDEX IX_Projects_title ON Projects (title, projectid)",
+    "CREATE INDEX IX_Projects_leader ON Projects (leader, projectid)",
+    "CREATE INDEX IX_Projects_projectstatus ON Projects (projectstatus, projectid)",
+    "CREATE INDEX IX_Projects_collegecampus ON Projects (collegecampus, projectid)",
+    """
+    CREATE INDEX IX_Projects_projectdate_value
+        ON Projects (projectdate_value, projectid)
+    """,
+    """
+    CREATE TABLE ProjectSDG (
+        projectid INTEGER NOT NULL,
+        sdg INTEGER NOT NULL,
+        PRIMARY KEY (projectid, sdg)
+    ) WITHOUT ROWID
+    """,
+    "CREATE INDEX IX_ProjectSDG_sdg ON ProjectSDG (sdg, projectid)",
+    """
+    CREATE TABLE DashboardSummary (
+        bucket TEXT NOT NULL,
+        bucket_key TEXT NOT NULL,
+        status TEXT NOT NULL,
+        total INTEGER NOT NULL,
+        PRIMARY KEY (bucket, bucket_key, status)
+    ) WITHOUT ROWID
+    """,
+    """
+    CREATE TABLE TableVersions (
+        table_name TEXT NOT NULL PRIMARY KEY,
+        version INTEGER NOT NULL DEFAULT 1,
+        updated_at TEXT NOT NULL DEFAULT CURRENT_TIMESTAMP
+    )
+    """,
+    "INSERT INTO TableVersions (table_name) VALUES ('Projects')",
+    # Same rows as the dbo.ProjectSummaryContrib view from migration 0005
+    """
+    CREATE VIEW ProjectSummaryContrib AS
+    SELECT p.projectid, 'status' AS bucket, p.projectstatus AS bucket_key,
+        p.projectstatus AS status
+    FROM Projects AS p
+    WHERE p.sdg IS NOT NULL AND p.projectstatus IN ('Completed', 'In Progress')
+    UNION ALL
+    SELECT p.projectid, 'sdg', CAST(ps.sdg AS TEXT), p.projectstatus
+    FROM Projects AS p
+    JOIN ProjectSDG AS ps ON ps.projectid = p.projectid
+    WHERE p.sdg IS NOT NULL AND p.projectstatus IN ('Completed', 'In Progress')
+    UNION ALL
+    SELECT p.projectid, 'campus', trim(p.collegecampus), p.projectstatus
+    FROM Projects AS p
+    WHERE p.sdg IS NOT NULL AND p.projectstatus IN ('Completed', 'In Progress')
+        AND NULLIF(trim(p.collegecampus), '') IS NOT NULL
+    UNION ALL
+    SELECT p.projectid, 'year', CAST(p.projectyear AS TEXT), p.projectstatus
+    FROM Projects AS p
+    WHERE p.sdg IS NOT NULL AND p.projectstatus IN ('Completed', 'In Progress')
+        AND p.projectyear IS NOT NULL
+    """,
+]
+
+CAMPUSES = [
+    "Main Campus",
+    "Ormoc Campus",
+    "Tanauan Campus",
+    "Burauen Campus",
+    "Carigara Campus",
+    "Dulag Campus",
+]
+STATUSES = ["Completed", "In Progress", "Planned"]
+WORDS = (
+    "community livelihood training water health literacy coastal farm youth "
+    "women solar disaster resilience mangrove nutrition digital school barangay "
+    "fisheries tourism sanitation enterprise heritage seedling clinic"
+).split()
+NAMES = "Ana Ben Carlo Dina Elmer Fe Gino Hazel Ivan Joy Karl Lea Mario Nina".split()
+SURNAMES = "Reyes Santos Cruz Bautista Ocampo Garcia Mendoza Torres Flores".split()
+
+
+def _register_converters():
+    sqlite3.register_adapter(datetime.date, lambda value: value.isoformat())
+    sqlite3.register_adapter(datetime.datetime, lambda value: value.isoformat(" "))
+
+
+def _create_functions(raw):
+    raw.create_function("FLOOR", 1, lambda v: None if v is None else math.floor(v))
+    raw.create_function("YEAR", 1, lambda v: int(v[:4]) if v else None)
+
+
+# --- T-SQL translation -------------------------------------------------------
+
+_TOP = re.compile(r"\bTOP \(\?\)\s*", re.IGNORECASE)
+_HINT = r"(?:HOLDLOCK|TABLOCKX|NOLOCK|UPDLOCK|ROWLOCK)"
+_HINTS = re.compile(rf"\s*WITH \({_HINT}(?:,\s*{_HINT})*\)", re.IGNORECASE)
+_ISNULL = re.compile(r"\bISNULL\(", re.IGNORECASE)
+# dbo.ProjectSDG is clustered on (projectid, sdg), so group_concat already
+# sees each project's SDGs in order
+_STRING_AGG = re.compile(
+    r"STRING_AGG\((.+?), ('.')\) WITHIN GROUP \(ORDER BY [^)]+\)", re.IGNORECASE
+)
+_OUTPUT = re.compile(r"\s+OUTPUT INSERTED\.(\w+)", re.IGNORECASE)
+
+
+def _apply_contribution(cursor, params):
+    sign, *projects = params
+    where = "projectid = ?" if len(projects) == 1 else "projectid BETWEEN ? AND ?"
+    cursor.execute(
+        f"""
+        INSERT INTO dbo.DashboardSummary (bucket, bucket_key, status, total)
+        SELECT bucket, bucket_key, status, COUNT(*) * ?
+        FROM dbo.ProjectSummaryContrib
+        WHERE {where}
+        GROUP BY bucket, bucket_key, status
+        ON CONFLICT (bucket, bucket_key, status)
+        DO UPDATE SET total = total + excluded.total
+        """,
+        [sign, *projects],
+    )
+    cursor.execute("DELETE FROM dbo.DashboardSummary WHERE total <= 0")
+
+
+# Statements with no mechanical translation: T-SQL text -> replacement
+OVERRIDES = {
+    summary.APPLY_CONTRIBUTION: _apply_contribution,
+    summary.APPLY_RANGE_CONTRIBUTION: _apply_contribution,
+    # No sequences: a single writer at a time makes MAX + 1 safe here
+    bulk.RESERVE_IDS: "SELECT IFNULL(MAX(projectid), 0) + 1 + 0 * ? FROM dbo.Projects",
+}
+
+
+@lru_cache(maxsize=1024)
+def translate(sql):
+    """
+    Return (sqlite_sql, top_index, limit_index): the statement rewritten for
+    SQLite, plus where the ``TOP (?)`` parameter was and where its ``LIMIT ?``
+    parameter now goes (both None if the statement has no TOP).
+    """
+    sql = _HINTS.sub("", sql)
+    sql = _ISNULL.sub("IFNULL(", sql)
+    sql = _STRING_AGG.sub(r"group_concat(\1, \2)", sql)
+    sql = sql.replace("SYSUTCDATETIME()", "CURRENT_TIMESTAMP")
+
+    output = _OUTPUT.search(sql)
+    if output is not None:
+        sql = f"{sql[: output.start()]}{sql[output.end() :]} RETURNING {output[1]}"
+
+    match = _TOP.search(sql)
+    if match is None:
+        return sql, None, None
+
+    top_index = sql.count("?", 0, match.start())
+    sql = sql[: match.start()] + sql[match.end() :]
+
+    # The LIMIT closes the SELECT the TOP belonged to: the end of the
+    # statement, or the parenthesis closing its subquery.
+    depth = 0
+    end = len(sql.rstrip().rstrip(";"))
+    for position in range(match.start(), end):
+        char = sql[position]
+        if char == "(":
+            depth += 1
+        elif char == ")":
+            if depth == 0:
+                end = position
+                break
+            depth -= 1
+
+    limit_index = sql.count("?", 0, end)
+    sql = f"{sql[:end]} LIMIT ?{sql[end:]}"
+    return sql, top_index, limit_index
+
+
+# --- pyodbc-compatible objects --------------------------------------------------
+
+
+class Cursor:
+    def __init__(self, raw):
+        self._raw = raw
+        self.fast_executemany = False
+
+    @staticmethod
+    def _params(args):
+        if len(args) == 1 and isinstance(args[0], (list, tuple)):
+            return list(args[0])
+        return list(args)
+
+    @staticmethod
+    def _translate(sql, params):
+        sql, top_index, limit_index = translate(sql)
+        if top_index is not None:
+            limit = params.pop(top_index)
+            params.insert(limit_index, limit)
+        return sql, params
+
+    def execute(self, sql, *args):
+        params = self._params(args)
+        override = OVERRIDES.get(sql)
+        if callable(override):
+            override(self, params)
+            return self
+        sql, params = self._translate(override or sql, params)
+        self._raw.execute(sql, params)
+        return self
+
+    def executemany(self, sql, seq_of_params):
+        sql, _ = self._translate(sql, [])
+        self._raw.executemany(sql, [list(params) for params in seq_of_params])
+
+    def fetchval(self):
+        row = self._raw.fetchone()
+        return row[0] if row is not None else None
+
+    def __iter__(self):
+        return iter(self._raw)
+
+    def __getattr__(self, name):
+        return getattr(self._raw, name)
+
+
+class Connection:
+    def __init__(self, path):
+        self._raw = sqlite3.connect(":memory:", timeout=30, check_same_thread=False)
+        self._raw.execute("ATTACH DATABASE ? AS dbo", (path,))
+        self._raw.execute("PRAGMA dbo.busy_timeout = 30000")
+        _create_functions(self._raw)
+        self.autocommit = False
+
+    def cursor(self):
+        return Cursor(self._raw.cursor())
+
+    def commit(self):
+        self._raw.commit()
+
+    def rollback(self):
+        self._raw.rollback()
+
+    def close(self):
+        self._raw.close()
+
+    def __getattr__(self, name):
+        return getattr(self._raw, name)
+
+
+# Only SQLite file names count; login.py's default string names the real database
+_DATABASE = re.compile(r"(?:^|;)\s*DATABASE=([^;]+\.sqlite)\s*(?:;|$)", re.IGNORECASE)
+
+
+def _database(connection_string):
+    match = _DATABASE.search(connection_string)
+    return match.group(1).strip() if match else None
+
+
+def install(path):
+    """Make ``import pyodbc`` (and so login.py) use the SQLite file at ``path``."""
+    _register_converters()
+
+    module = types.ModuleType("pyodbc")
+    module.__doc__ = "SQLite stand-in installed by bench.sqlite_backend"
+    module.version = "5.1.0"
+    module.paramstyle = "qmark"
+    module.apilevel = "2.0"
+    module.threadsafety = 1
+    for name in (
+        "Error",
+        "DatabaseError",
+        "IntegrityError",
+        "OperationalError",
+        "ProgrammingError",
+        "InterfaceError",
+        "DataError",
+        "NotSupportedError",
+        "InternalError",
+    ):
+        setattr(module, name, getattr(sqlite3, name))
+    module.Connection = Connection
+    module.Cursor = Cursor
+    module.connect = lambda *args, **kwargs: Connection(
+        _database(args[0] if args else "") or path
+    )
+    sys.modules["pyodbc"] = module
+    return module
+
+
+# --- Synthetic data -----------------------------------------------------------
+
+
+def _project(rng, projectid):
+    day = datetime.date(2019, 1, 1) + datetime.timedelta(days=rng.randrange(2400))
+    # Mostly form-style dates, some of the legacy free-text shapes
+    if rng.random() < 0.8:
+        projectdate = day.isoformat()
+    else:
+        projectdate = day.strftime("%B %Y")
+    goals = sorted(rng.sample(range(1, 18), rng.randint(1, 3)))
+    title = " ".join(rng.choice(WORDS).capitalize() for _ in range(rng.randint(3, 6)))
+    members = ", ".join(
+        f"{rng.choice(NAMES)} {rng.choice(SURNAMES)}" for _ in range(rng.randint(2, 6))
+    )
+    return (
+        projectid,
+        f"{title} Program {projectid}",
+        f"Barangay {rng.randint(1, 120)}, Leyte",
+        f"{rng.choice(NAMES)} {rng.choice(SURNAMES)}",
+        f"{rng.choice(NAMES)} {rng.choice(SURNAMES)}",
+        members,
+        projectdate,
+        f"{rng.randint(1, 12)} months",
+        rng.choice(STATUSES),
+        f"project-{projectid}.pdf" if rng.random() < 0.3 else None,
+        round(rng.uniform(124.3, 125.7), 6),
+        round(rng.uniform(10.0, 11.8), 6),
+        sdgs.to_csv(goals),
+        rng.choice(CAMPUSES),
+        day.isoformat(),
+    ), [(projectid, goal) for goal in goals]
+
+
+def seed(path, rows, batch_size=10000, random_seed=2024):
+    """Create the schema in a new SQLite file and insert ``rows`` projects."""
+    raw = sqlite3.connect(path)
+    try:
+        raw.execute("PRAGMA journal_mode = WAL")
+        raw.execute("PRAGMA synchronous = OFF")
+        for statement in SCHEMA:
+            raw.execute(statement)
+
+        rng = random.Random(random_seed)
+        for start in range(1, rows + 1, batch_size):
+            projects = []
+            goals = []
+            for projectid in range(start, min(start + batch_size, rows + 1)):
+                project, project_goals = _project(rng, projectid)
+                projects.append(project)
+                goals.extend(project_goals)
+            raw.executemany(
+                f"INSERT INTO Projects VALUES ({', '.join('?' * 15)})", projects
+            )
+            raw.executemany("INSERT INTO ProjectSDG VALUES (?, ?)", goals)
+
+        raw.execute("""
+            INSERT INTO DashboardSummary (bucket, bucket_key, status, total)
+            SELECT bucket, bucket_key, status, COUNT(*)
+            FROM ProjectSummaryContrib
+            GROUP BY bucket, bucket_key, status
+        """)
+        raw.commit()
+        raw.execute("PRAGMA synchronous = NORMAL")
+        raw.execute("ANALYZE")
+    finally:
+        raw.close()
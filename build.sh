@@ -10,4 +10,7 @@ curl https://packages.microsoft.com/config/debian/11/prod.list > /etc/apt/source
 apt-get update
 ACCEPT_EULA=Y apt-get install -y msodbcsql18 unixodbc-dev
 
-pip install -r requirements.txt
\ No newline at end of file
+pip install -r requirements.txt
+
+# Resized AVIF/WebP/JPEG versions of static/images (see images.py)
+python images.py
@@ -0,0 +1,317 @@
+"""
+Bulk import and export of dbo.Projects as CSV, JSON or JSON Lines.
+
+Imports are read and validated row by row as the file streams in. Valid rows
+are inserted in batches with ``fast_executemany``, using a block of IDs
+reserved from dbo.ProjectIdSeq, and everything happens in one transaction. Any
+invalid row rolls the whole import back unless ``skip_invalid`` is set. Either
+way every bad row is reported with its 1-based record number.
+
+Exports stream the table in batches in the same column layout, so an export
+can be imported again (projectid is ignored on import).
+"""
+
+import csv
+import io
+import json
+
+import dates
+import sdgs
+import summary
+import versions
+
+IMPORT_COLUMNS = (
+    "title",
+    "projectlocation",
+    "leader",
+    "assistant",
+    "members",
+    "projectdate",
+    "duration",
+    "projectstatus",
+    "link",
+    "x",
+    "y",
+    "sdg",
+    "collegecampus",
+)
+EXPORT_COLUMNS = ("projectid",) + IMPORT_COLUMNS
+
+FORMATS = ("csv", "json", "ndjson")
+CONTENT_TYPES = {
+    "csv": "text/csv; charset=utf-8",
+    "json": "application/json",
+    "ndjson": "application/x-ndjson",
+}
+
+DEFAULT_BATCH_SIZE = 500
+MAX_BATCH_SIZE = 5000
+EXPORT_BATCH = 1000
+
+# Only the first this many row errors are returned
+MAX_REPORTED_ERRORS = 1000
+
+# Reserves @range_size consecutive IDs and returns the first one. NOCOUNT keeps
+# the rowcount of the EXEC from coming back ahead of the SELECT; it is switched
+# off again because the setting outlives the batch on the pooled connection,
+# and rowcount reads -1 while it is on.
+RESERVE_IDS = """
+SET NOCOUNT ON;
+DECLARE @first SQL_VARIANT;
+EXEC sys.sp_sequence_get_range
+    @sequence_name = N'dbo.ProjectIdSeq',
+    @range_size = ?,
+    @range_first_value = @first OUTPUT;
+SELECT CAST(@first AS INT);
+SET NOCOUNT OFF;
+"""
+
+_INSERT_COLUMNS = ("projectid",) + IMPORT_COLUMNS + ("projectdate_value",)
+INSERT_PROJECT = (
+    f"INSERT INTO dbo.Projects ({', '.join(_INSERT_COLUMNS)})"
+    f" VALUES ({', '.join('?' for _ in _INSERT_COLUMNS)})"
+)
+INSERT_SDG = "INSERT INTO dbo.ProjectSDG (projectid, sdg) VALUES (?, ?)"
+
+
+def detect_format(requested=None, filename=None, content_type=None):
+    """Pick the format from an explicit choice, the file extension or MIME type."""
+    if requested:
+        if requested not in FORMATS:
+            raise ValueError(f"Unknown format {requested!r}; use one of {FORMATS}")
+        return requested
+    if filename:
+        extension = filename.rsplit(".", 1)[-1].lower()
+        if extension in ("jsonl", "ndjson"):
+            return "ndjson"
+        if extension in FORMATS:
+            return extension
+    for fmt, mime in CONTENT_TYPES.items():
+        if content_type and content_type == mime.split(";")[0]:
+            return fmt
+    return "csv"
+
+
+def read_rows(stream, fmt):
+    """
+    Yield one dict per record from a binary stream. CSV and JSON Lines are read
+    incrementally; a JSON array is parsed whole (JSON Lines is accepted under
+    ``json`` too).
+    """
+    text = io.TextIOWrapper(stream, encoding="utf-8-sig", newline="")
+    if fmt == "csv":
+        yield from csv.DictReader(text)
+        return
+
+    first = text.read(1)
+    while first and first.isspace():
+        first = text.read(1)
+    if fmt == "json" and first == "[":
+        records = json.loads(first + text.read())
+        if not isinstance(records, list):
+            raise ValueError("Expected a JSON array of project objects")
+        yield from records
+        return
+
+    for line in _prepend(first, text):
+        if line.strip():
+            yield json.loads(line)
+
+
+def _prepend(first, text):
+    lines = iter(text)
+    yield first + next(lines, "")
+    yield from lines
+
+
+def clean_row(record):
+    """
+    Validate one record. Returns (column values in IMPORT_COLUMNS order plus
+    projectdate_value, SDG numbers), or raises ValueError with the reason.
+    """
+    if not isinstance(record, dict):
+        raise ValueError("record is not an object")
+
+    values = {}
+    for column in IMPORT_COLUMNS:
+        value = record.get(column)
+        if column == "sdg" or value is None:
+            values[column] = value
+            continue
+        value = str(value).strip()
+        values[column] = value or None
+
+    if not values["title"]:
+        raise ValueError("title is required")
+
+    sdg = values["sdg"]
+    sdg_numbers = sdgs.parse(sdg if isinstance(sdg, list) else str(sdg or ""))
+    if not sdg_numbers:
+        raise ValueError("at least one SDG (1-17) is required")
+    values["sdg"] = sdgs.to_csv(sdg_numbers)
+
+    for column, limit in (("x", 180), ("y", 90)):
+        if values[column] is None:
+            continue
+        try:
+            coordinate = float(values[column])
+        except ValueError:
+            raise ValueError(f"{column} is not a number") from None
+        if not -limit <= coordinate <= limit:
+            raise ValueError(f"{column} is out of range")
+        values[column] = coordinate
+
+    cleaned = [values[column] for column in IMPORT_COLUMNS]
+    cleaned.append(dates.parse_project_date(values["projectdate"]))
+    return cleaned, sdg_numbers
+
+
+def _reserve_ids(cursor, count):
+    return cursor.execute(RESERVE_IDS, count).fetchval()
+
+
+def _insert_batch(cursor, batch):
+    first = _reserve_ids(cursor, len(batch))
+    projects = []
+    goals = []
+    for offset, (values, sdg_numbers) in enumerate(batch):
+        projectid = first + offset
+        projects.append([projectid] + values)
+        goals.extend((projectid, number) for number in sdg_numbers)
+
+    cursor.executemany(INSERT_PROJECT, projects)
+    cursor.executemany(INSERT_SDG, goals)
+    summary.add_project_range(cursor, first, first + len(batch) - 1)
+    return first
+
+
+def import_projects(
+    conn, records, batch_size=DEFAULT_BATCH_SIZE, skip_invalid=False, dry_run=False
+):
+    """
+    Validate and insert ``records`` in one transaction.
+
+    Returns a dict with ``inserted`` (for a dry run: rows that would be),
+    ``invalid``, ``errors`` (list of {"row", "error"}, capped at
+    MAX_REPORTED_ERRORS), ``first_ids`` (first ID of each inserted batch),
+    ``committed`` and ``version`` (the dbo.Projects version it committed).
+    """
+    result = {
+        "inserted": 0,
+        "invalid": 0,
+        "errors": [],
+        "first_ids": [],
+        "committed": False,
+        "dry_run": dry_run,
+        "version": None,
+    }
+
+    def report(row, message):
+        result["invalid"] += 1
+        if len(result["errors"]) < MAX_REPORTED_ERRORS:
+            result["errors"].append({"row": row, "error": message})
+
+    cursor = conn.cursor()
+    cursor.fast_executemany = True
+    batch = []
+    try:
+        records = iter(records)
+        row = 0
+        while True:
+            row += 1
+            try:
+                record = next(records)
+            except StopIteration:
+                break
+            except (ValueError, csv.Error) as e:
+                # Unreadable input: nothing after this point can be trusted
+                report(row, f"unreadable input: {e}")
+                skip_invalid = False
+                break
+
+            try:
+                batch.append(clean_row(record))
+            except ValueError as e:
+                report(row, str(e))
+                continue
+
+            if len(batch) >= batch_size:
+                if not dry_run:
+                    result["first_ids"].append(_insert_batch(cursor, batch))
+                result["inserted"] += len(batch)
+                batch = []
+
+        if batch:
+            if not dry_run:
+                result["first_ids"].append(_insert_batch(cursor, batch))
+            result["inserted"] += len(batch)
+
+        if (
+            dry_run
+            or (result["invalid"] and not skip_invalid)
+            or not result["inserted"]
+        ):
+            conn.rollback()
+            if not dry_run:
+                result["inserted"] = 0
+                result["first_ids"] = []
+        else:
+            result["version"] = versions.bump(cursor, "Projects")
+            conn.commit()
+            result["committed"] = True
+    except Exception:
+        conn.rollback()
+        raise
+    finally:
+        cursor.close()
+
+    return result
+
+
+def _csv_chunk(rows):
+    buffer = io.StringIO()
+    csv.writer(buffer).writerows(rows)
+    return buffer.getvalue().encode("utf-8")
+
+
+def _json_row(row):
+    return json.dumps(
+        dict(zip(EXPORT_COLUMNS, row)), default=str, ensure_ascii=False
+    ).encode("utf-8")
+
+
+def export_projects(conn, fmt="csv"):
+    """
+    Run the export query on ``conn`` and return a generator of encoded chunks.
+    As with project_stream, the caller releases ``conn`` once the response is done.
+    """
+    cursor = conn.cursor()
+    cursor.execute(
+        f"SELECT {', '.join(EXPORT_COLUMNS)} FROM dbo.Projects ORDER BY projectid"
+    )
+
+    def write():
+        if fmt == "csv":
+            yield _csv_chunk([EXPORT_COLUMNS])
+        elif fmt == "json":
+            yield b"["
+
+        first = True
+        while True:
+            rows = cursor.fetchmany(EXPORT_BATCH)
+            if not rows:
+                break
+            if fmt == "csv":
+                yield _csv_chunk(rows)
+            elif fmt == "json":
+                chunk = b",".join(_json_row(row) for row in rows)
+                yield chunk if first else b"," + chunk
+            else:
+                yield b"".join(_json_row(row) + b"\n" for row in rows)
+            first = False
+        cursor.close()
+
+        if fmt == "json":
+            yield b"]"
+
+    return write()
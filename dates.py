@@ -0,0 +1,81 @@
+"""
+Parsing of the free-text dbo.Projects.projectdate column.
+
+New rows come from an <input type="date"> ("2024-03-14"); older rows hold
+things like "March 2024" or "March 14, 2022". The parsed value is stored in
+dbo.Projects.projectdate_value (DATE) and its indexed, computed projectyear
+column, so nothing parses dates per request any more.
+"""
+
+from datetime import datetime
+from functools import lru_cache
+
+import versions
+
+# Tried in order; formats without a day resolve to the 1st of the month
+DATE_FORMATS = (
+    "%Y-%m-%d",
+    "%B %Y",
+    "%B %d, %Y",
+    "%B %d %Y",
+    "%b %Y",
+    "%b %d, %Y",
+    "%b. %d, %Y",
+    "%d %B %Y",
+    "%m/%d/%Y",
+    "%Y",
+)
+
+
+@lru_cache(maxsize=4096)
+def parse_project_date(text):
+    """Return a ``date`` for ``text``, or None if no known format matches."""
+    if not text:
+        return None
+    text = " ".join(str(text).split())
+    for fmt in DATE_FORMATS:
+        try:
+            return datetime.strptime(text, fmt).date()
+        except ValueError:
+            continue
+    return None
+
+
+def backfill(conn, only_missing=True, batch_size=500):
+    """
+    Parse projectdate into projectdate_value for every row (or only rows not
+    parsed yet). Returns (updated row count, {unparseable text: [projectids]}).
+    """
+    cursor = conn.cursor()
+    where = "WHERE projectdate IS NOT NULL"
+    if only_missing:
+        where += " AND projectdate_value IS NULL"
+    cursor.execute(f"SELECT projectid, projectdate FROM dbo.Projects {where}")
+    rows = cursor.fetchall()
+
+    updates = []
+    unparseable = {}
+    for projectid, text in rows:
+        value = parse_project_date(text)
+        if value is None:
+            if text.strip():
+                unparseable.setdefault(text, []).append(projectid)
+            continue
+        updates.append((value, projectid))
+
+    try:
+        cursor.fast_executemany = True
+        for start in range(0, len(updates), batch_size):
+            cursor.executemany(
+                "UPDATE dbo.Projects SET projectdate_value = ? WHERE projectid = ?",
+                updates[start : start + batch_size],
+            )
+        versions.bump(cursor, "Projects")
+        conn.commit()
+    except Exception:
+        conn.rollback()
+        raise
+    finally:
+        cursor.close()
+
+    return len(updates), unparseable
@@ -0,0 +1,289 @@
+"""
+Bounded pool of pyodbc connections.
+
+The raw-SQL routes in login.py and the SQLAlchemy engine behind ``User`` both
+check connections out of the same ``ConnectionPool``, so a worker holds one set
+of Azure SQL logins instead of paying a TLS/login handshake on every request.
+"""
+
+import threading
+import time
+from collections import deque
+
+
+class PoolTimeout(Exception):
+    """Raised when no connection frees up within the pool timeout."""
+
+
+class _Entry:
+    __slots__ = ("raw", "created_at", "last_used")
+
+    def __init__(self, raw):
+        now = time.monotonic()
+        self.raw = raw
+        self.created_at = now
+        self.last_used = now
+
+
+class PooledConnection:
+    """
+    Proxy around a checked-out pyodbc connection.
+
+    ``close()`` hands the connection back to the pool instead of closing it, and
+    using the proxy as a context manager releases it even when the block raises
+    (rolling back whatever was left uncommitted).
+    """
+
+    def __init__(self, pool, entry):
+        self._pool = pool
+        self._entry = entry
+
+    @property
+    def raw(self):
+        if self._entry is None:
+            raise RuntimeError("Connection has already been returned to the pool")
+        return self._entry.raw
+
+    def cursor(self):
+        cursor = self.raw.cursor()
+        if self._pool.cursor_factory is not None:
+            cursor = self._pool.cursor_factory(cursor)
+        return cursor
+
+    def commit(self):
+        self.raw.commit()
+
+    def rollback(self):
+        self.raw.rollback()
+
+    @property
+    def autocommit(self):
+        return self.raw.autocommit
+
+    @autocommit.setter
+    def autocommit(self, value):
+        self.raw.autocommit = value
+
+    def __getattr__(self, name):
+        return getattr(self.raw, name)
+
+    def close(self):
+        if self._entry is not None:
+            entry, self._entry = self._entry, None
+            self._pool._release(entry)
+
+    def invalidate(self):
+        """Drop the underlying connection instead of returning it to the pool."""
+        if self._entry is not None:
+            entry, self._entry = self._entry, None
+            self._pool._release(entry, discard=True)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        if exc_type is not None and self._entry is not None:
+            try:
+                self._entry.raw.rollback()
+            except Exception:
+                self.invalidate()
+                return False
+        self.close()
+        return False
+
+
+class ConnectionPool:
+    """
+    Thread-safe, bounded connection pool.
+
+    - at most ``size`` connections are open at once; callers wait up to
+      ``timeout`` seconds for one to be released before ``PoolTimeout``
+    - connections idle for more than ``ping_after`` seconds are health checked
+      with ``SELECT 1`` on checkout and replaced if the check fails
+    - connections idle for more than ``idle_timeout`` seconds are closed, and
+      connections older than ``recycle`` seconds are not reused
+
+    ``cursor_factory`` (if given) wraps every cursor handed out by a checked-out
+    connection, and ``on_checkout(wait_seconds, connect_seconds)`` is called
+    after each checkout with the time spent waiting for a slot and the time
+    spent opening a new connection (None when an idle one was reused).
+    """
+
+    def __init__(
+        self,
+        creator,
+        size=5,
+        timeout=30.0,
+        idle_timeout=300.0,
+        recycle=1800.0,
+        ping_after=30.0,
+        cursor_factory=None,
+        on_checkout=None,
+    ):
+        self._creator = creator
+        self.size = size
+        self.timeout = timeout
+        self.idle_timeout = idle_timeout
+        self.recycle = recycle
+        self.ping_after = ping_after
+        self.cursor_factory = cursor_factory
+        self.on_checkout = on_checkout
+
+        self._idle = deque()
+        self._open = 0
+        self._cond = threading.Condition()
+
+    def connect(self):
+        """Check out a connection. Call ``close()`` (or use ``with``) to release it."""
+        started = time.monotonic()
+        deadline = started + self.timeout
+        while True:
+            entry, expired = self._acquire_slot(deadline)
+            self._close_all(expired)
+
+            if entry is None:
+                acquired = time.monotonic()
+                entry = self._create()
+                self._checked_out(acquired - started, time.monotonic() - acquired)
+                return PooledConnection(self, entry)
+            if self._is_usable(entry):
+                self._checked_out(time.monotonic() - started, None)
+                return PooledConnection(self, entry)
+
+            # Stale or broken: free its slot and try again
+            self._release(entry, discard=True)
+
+    def connection(self):
+        """Alias of ``connect()`` that reads better in ``with`` blocks."""
+        return self.connect()
+
+    def status(self):
+        with self._cond:
+            return {
+                "size": self.size,
+                "open": self._open,
+                "idle": len(self._idle),
+                "in_use": self._open - len(self._idle),
+            }
+
+    def warm(self, count=None):
+        """
+        Open idle connections until ``count`` (default and cap: ``size``) are
+        open, so the next requests don't pay for the handshake. Returns how
+        many were opened; connection errors propagate.
+        """
+        target = self.size if count is None else min(count, self.size)
+        opened = 0
+        while True:
+            with self._cond:
+                if self._open >= target:
+                    return opened
+                self._open += 1
+            entry = self._create()
+            opened += 1
+            with self._cond:
+                self._idle.append(entry)
+                self._cond.notify()
+
+    def dispose(self):
+        """Close every idle connection. Checked-out connections close on release."""
+        with self._cond:
+            idle = list(self._idle)
+            self._idle.clear()
+            self._open -= len(idle)
+            self._cond.notify_all()
+        self._close_all(idle)
+
+    def _checked_out(self, wait_seconds, connect_seconds):
+        if self.on_checkout is not None:
+            try:
+                self.on_checkout(wait_seconds, connect_seconds)
+            except Exception:
+                pass  # instrumentation must never fail a checkout
+
+    def _acquire_slot(self, deadline):
+        # Returns (entry, expired): an idle entry to reuse, or None when the
+        # caller has reserved a slot and must open a new connection.
+        expired = []
+        with self._cond:
+            while True:
+                expired.extend(self._evict_idle_locked())
+                if self._idle:
+                    return self._idle.pop(), expired
+                if self._open < self.size:
+                    self._open += 1
+                    return None, expired
+
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                self._cond.wait(remaining)
+
+        self._close_all(expired)
+        raise PoolTimeout(
+            f"No database connection available within {self.timeout}s "
+            f"(pool size {self.size})"
+        )
+
+    def _evict_idle_locked(self):
+        # Idle connections are reused LIFO, so the oldest idle ones sit at the left
+        now = time.monotonic()
+        expired = []
+        while self._idle and now - self._idle[0].last_used > self.idle_timeout:
+            expired.append(self._idle.popleft())
+            self._open -= 1
+        if expired:
+            self._cond.notify_all()
+        return expired
+
+    def _create(self):
+        try:
+            return _Entry(self._creator())
+        except Exception:
+            with self._cond:
+                self._open -= 1
+                self._cond.notify()
+            raise
+
+    def _is_usable(self, entry):
+        now = time.monotonic()
+        if now - entry.created_at > self.recycle:
+            return False
+        if now - entry.last_used <= self.ping_after:
+            return True
+        try:
+            cursor = entry.raw.cursor()
+            cursor.execute("SELECT 1")
+            cursor.fetchone()
+            cursor.close()
+            return True
+        except Exception:
+            return False
+
+    def _release(self, entry, discard=False):
+        if not discard:
+            try:
+                # Never hand the next caller someone else's open transaction
+                entry.raw.rollback()
+            except Exception:
+                discard = True
+
+        if discard:
+            with self._cond:
+                self._open -= 1
+                self._cond.notify()
+            self._close_all([entry])
+            return
+
+        entry.last_used = time.monotonic()
+        with self._cond:
+            self._idle.append(entry)
+            self._cond.notify()
+
+    @staticmethod
+    def _close_all(entries):
+        for entry in entries:
+            try:
+                entry.raw.close()
+            except Exception:
+                pass
@@ -0,0 +1,161 @@
+"""
+Project change feed for open pages, as server-sent events (/events).
+
+The write endpoints' ``projects_changed`` signal is turned into compact events
+("add", "edit", "delete", "import") and published to an in-process
+``Broadcaster``. It keeps the last EVENTS_BACKLOG of them, so a client that
+reconnects with ``Last-Event-ID`` gets what it missed. If that is no longer
+possible (the id is too old, or came from another worker or an earlier
+process), the client gets a "resync" event and refetches what it shows.
+
+Each gunicorn worker has its own broadcaster and only sees its own writes.
+To cover writes handled by other workers, an idle stream re-reads the
+dbo.Projects version every EVENTS_HEARTBEAT seconds and sends "resync" when
+it moved past the last version this worker published.
+
+A stream holds a request thread for as long as the page is open, so at most
+EVENTS_MAX_STREAMS run per worker (gunicorn.conf.py adds as many threads).
+Clients beyond that get ``BUSY``: a stream that only sets the reconnection
+delay and ends, so EventSource tries again after EVENTS_RETRY_MS (it gives up
+for good on an error status).
+"""
+
+import json
+import os
+import threading
+import uuid
+from collections import deque
+
+EVENTS_BACKLOG = int(os.environ.get("EVENTS_BACKLOG", 1000))
+EVENTS_HEARTBEAT = float(os.environ.get("EVENTS_HEARTBEAT", 15))
+EVENTS_MAX_STREAMS = int(os.environ.get("EVENTS_MAX_STREAMS", 16))
+EVENTS_RETRY_MS = int(os.environ.get("EVENTS_RETRY_MS", 3000))
+
+CONTENT_TYPE = "text/event-stream"
+BUSY = f"retry: {EVENTS_RETRY_MS}\n: too many open streams, reconnect later\n\n"
+
+
+class Broadcaster:
+    def __init__(self, backlog=EVENTS_BACKLOG, max_streams=EVENTS_MAX_STREAMS):
+        # Event ids are "<token>-<seq>"; the token tells this process's ids apart
+        self.token = uuid.uuid4().hex[:8]
+        self.max_streams = max_streams
+        self.version = 0  # highest dbo.Projects version published here
+
+        self._events = deque(maxlen=backlog)  # (seq, name, data, version)
+        self._seq = 0
+        self._streams = 0
+        self._cond = threading.Condition()
+
+    def publish(self, name, data, version=None):
+        with self._cond:
+            self._seq += 1
+            payload = json.dumps(data, separators=(",", ":"), default=str)
+            self._events.append((self._seq, name, payload, version))
+            if version is not None:
+                self.version = max(self.version, version)
+            self._cond.notify_all()
+
+    def resume_point(self, last_event_id):
+        """
+        (seq to continue after, replayable?) for a client's Last-Event-ID.
+        Not replayable means the client has to resync.
+        """
+        with self._cond:
+            if not last_event_id:
+                return self._seq, True
+            token, _, seq = last_event_id.partition("-")
+            if token != self.token or not seq.isdigit() or int(seq) > self._seq:
+                return self._seq, False
+            oldest = self._events[0][0] if self._events else self._seq + 1
+            if int(seq) < oldest - 1:
+                return self._seq, False
+            return int(seq), True
+
+    def wait(self, after, timeout):
+        """Events with seq > ``after``, waiting up to ``timeout`` for one."""
+        with self._cond:
+            if self._seq <= after:
+                self._cond.wait(timeout)
+            return [event for event in self._events if event[0] > after]
+
+    def try_open(self):
+        with self._cond:
+            if self._streams >= self.max_streams:
+                return False
+            self._streams += 1
+            return True
+
+    def close(self):
+        with self._cond:
+            self._streams -= 1
+
+    def stats(self):
+        with self._cond:
+            return {
+                "streams": self._streams,
+                "buffered": len(self._events),
+                "last_seq": self._seq,
+                "version": self.version,
+            }
+
+
+def format_event(name, data, event_id=None):
+    lines = []
+    if event_id is not None:
+        lines.append(f"id: {event_id}")
+    lines.append(f"event: {name}")
+    lines.append(f"data: {data}")
+    return "\n".join(lines) + "\n\n"
+
+
+def stream(broadcaster, last_event_id, current_version):
+    """
+    Generator of SSE text for one client. ``current_version()`` reads the
+    dbo.Projects version (see the module docstring). The caller takes a slot
+    with ``try_open()`` and releases it with ``close()`` when the response is
+    closed, which also happens when the body is never iterated (HEAD).
+    """
+    seq, replayable = broadcaster.resume_point(last_event_id)
+    known_version = max(current_version(), broadcaster.version)
+
+    yield f"retry: {EVENTS_RETRY_MS}\n\n"
+    if not replayable:
+        yield format_event("resync", '{"reason":"resume"}')
+
+    while True:
+        events = broadcaster.wait(seq, EVENTS_HEARTBEAT)
+        for seq, name, data, version in events:
+            if version is not None:
+                known_version = max(known_version, version)
+            yield format_event(name, data, f"{broadcaster.token}-{seq}")
+        if events:
+            continue
+
+        version = current_version()
+        if version > known_version:
+            # Written through another worker
+            known_version = version
+            yield format_event("resync", f'{{"version":{version}}}')
+        else:
+            yield ": keep-alive\n\n"
+
+
+def compact_project(projectid, data):
+    """The fields an open page needs to patch itself after a write."""
+    project = {"projectid": projectid}
+    for column, key in (
+        ("title", "title"),
+        ("projectstatus", "projectstatus"),
+        ("collegecampus", "collegecampus"),
+        ("x", "lng"),
+        ("y", "lat"),
+    ):
+        if data.get(column) not in (None, ""):
+            project[key] = data[column]
+    for key in ("lat", "lng"):
+        try:
+            project[key] = float(project[key])
+        except (KeyError, ValueError):
+            project.pop(key, None)
+    return project
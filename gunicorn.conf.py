@@ -0,0 +1,46 @@
+"""
+gunicorn settings for login:app (``gunicorn -c gunicorn.conf.py login:app``).
+
+Workers are threaded (gthread): pyodbc releases the GIL while it waits on SQL
+Server, so one slow dashboard query only holds its own thread, not the whole
+worker. gevent is not an option here because pyodbc's socket I/O happens in the
+C driver, which gevent cannot make cooperative.
+
+Each worker has its own ConnectionPool of DB_POOL_SIZE connections. Threads are
+sized to match, plus a couple of spares so static files and /health are still
+answered while every connection is busy, plus EVENTS_MAX_STREAMS for /events
+streams, which hold a thread each but no connection. Workers scale with CPU
+count and are capped so that workers * DB_POOL_SIZE stays within
+DB_MAX_CONNECTIONS, if set.
+"""
+
+import os
+
+CPU_COUNT = os.cpu_count() or 1
+DB_POOL_SIZE = int(os.environ.get("DB_POOL_SIZE", 5))
+DB_MAX_CONNECTIONS = int(os.environ.get("DB_MAX_CONNECTIONS", 0))
+EVENTS_MAX_STREAMS = int(os.environ.get("EVENTS_MAX_STREAMS", 16))
+
+bind = f"0.0.0.0:{os.environ.get('PORT', 8000)}"
+
+worker_class = "gthread"
+workers = int(os.environ.get("WEB_CONCURRENCY", CPU_COUNT + 1))
+if DB_MAX_CONNECTIONS:
+    workers = max(1, min(workers, DB_MAX_CONNECTIONS // DB_POOL_SIZE))
+threads = int(os.environ.get("GUNICORN_THREADS", DB_POOL_SIZE + 2 + EVENTS_MAX_STREAMS))
+
+# Seconds. gthread workers heartbeat from their main loop, so this only restarts a
+# worker that has hung as a whole, not one with a slow request or export
+timeout = int(os.environ.get("GUNICORN_TIMEOUT", 60))
+graceful_timeout = 30
+keepalive = 5
+
+# Not preloaded: the pool, the log queue listener and the password hashing
+# threads are created at import and must belong to the worker, not the master
+preload_app = False
+
+# Heartbeat files on tmpfs; a disk-backed /tmp can stall workers on some hosts
+if os.path.isdir("/dev/shm"):
+    worker_tmp_dir = "/dev/shm"
+
+errorlog = "-"
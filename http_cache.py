@@ -0,0 +1,120 @@
+"""
+Conditional GET and response compression for the JSON endpoints.
+
+ETags are derived from dbo.TableVersions (see versions.py) plus whatever
+identifies the resource, so they change exactly when the underlying data does.
+Each encoding of a body gets its own strong ETag ("<tag>-br", "<tag>-gzip").
+"""
+
+import gzip
+import hashlib
+import zlib
+
+from flask import Response, request
+
+try:
+    import brotli
+except ImportError:  # brotli is optional; fall back to gzip
+    brotli = None
+
+# Bodies smaller than this are sent as-is; compressing them isn't worth it
+MIN_COMPRESS_SIZE = 1024
+
+
+def make_etag(*parts):
+    return hashlib.sha1(
+        ":".join(str(part) for part in parts).encode("utf-8")
+    ).hexdigest()
+
+
+def negotiate_encoding():
+    """Pick the best Content-Encoding the client accepts, or None."""
+    accepted = request.accept_encodings
+    if brotli is not None and accepted["br"]:
+        return "br"
+    if accepted["gzip"]:
+        return "gzip"
+    return None
+
+
+def encode_body(body, encoding):
+    """Compress ``body`` with ``encoding``. Returns (body, encoding actually used)."""
+    if encoding is None or len(body) < MIN_COMPRESS_SIZE:
+        return body, None
+    if encoding == "br":
+        return brotli.compress(body, quality=5), "br"
+    return gzip.compress(body, compresslevel=6), "gzip"
+
+
+def encode_stream(chunks, encoding):
+    """Compress an iterable of byte chunks incrementally with ``encoding``."""
+    if encoding is None:
+        yield from chunks
+        return
+
+    if encoding == "br":
+        compressor = brotli.Compressor(quality=5)
+        compress, flush = compressor.process, compressor.finish
+    else:
+        compressor = zlib.compressobj(6, zlib.DEFLATED, 31)  # 31: gzip container
+        compress, flush = compressor.compress, compressor.flush
+
+    for chunk in chunks:
+        data = compress(chunk)
+        if data:
+            yield data
+    yield flush()
+
+
+def _tag(etag, encoding):
+    return f"{etag}-{encoding}" if encoding else etag
+
+
+def _finish(response, etag, encoding):
+    response.set_etag(_tag(etag, encoding))
+    response.vary.add("Accept-Encoding")
+    # Let browsers keep the body but always revalidate it with If-None-Match
+    response.cache_control.no_cache = True
+    return response
+
+
+def not_modified(etag):
+    """Return a 304 response if the client already holds ``etag``, else None."""
+    encoding = negotiate_encoding()
+    for candidate in (encoding, None):
+        if request.if_none_match.contains(_tag(etag, candidate)):
+            return _finish(Response(status=304), etag, candidate)
+    return None
+
+
+def json_response(body, etag, encoding=None):
+    """
+    Build a 200 response for an already serialized (and possibly already
+    compressed) JSON ``body``; ``encoding`` is the encoding ``body`` is in.
+    """
+    response = Response(body, mimetype="application/json")
+    if encoding:
+        response.headers["Content-Encoding"] = encoding
+    return _finish(response, etag, encoding)
+
+
+def streamed_json(chunks, etag):
+    """Stream JSON ``chunks`` to the client, compressed on the fly if accepted."""
+    encoding = negotiate_encoding()
+    response = Response(encode_stream(chunks, encoding), mimetype="application/json")
+    if encoding:
+        response.headers["Content-Encoding"] = encoding
+    return _finish(response, etag, encoding)
+
+
+def conditional_json(etag, build_body):
+    """
+    Answer 304 when ``etag`` still matches; otherwise serialize via
+    ``build_body()`` (which returns bytes) and compress if worthwhile.
+    """
+    response = not_modified(etag)
+    if response is not None:
+        return response
+
+    body, encoding = encode_body(build_body(), negotiate_encoding())
+    return json_response(body, etag, encoding)
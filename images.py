@@ -0,0 +1,231 @@
+"""
+Resized AVIF/WebP/JPEG derivatives of the images in static/images.
+
+The originals are print-resolution JPEGs of 1-1.7 MB each, shown as 180px
+cards and a 400px-high carousel. ``responsive_image`` (a template global)
+emits a ``<picture>`` whose ``srcset`` lists derivatives at the WIDTHS that fit
+the original. Each derivative's file name carries a hash of the original's
+bytes and the encoder settings, so the files never change and are served from
+/images/ with an immutable, year-long Cache-Control.
+
+Derivatives are made ahead of time by ``python images.py`` (run from
+build.sh) and otherwise on first request. They are written to IMAGE_CACHE_DIR
+with an atomic rename, so concurrent requests for the same file are harmless.
+AVIF is skipped when Pillow has no AVIF encoder.
+"""
+
+import argparse
+import hashlib
+import io
+import os
+import re
+import tempfile
+import threading
+
+from markupsafe import Markup, escape
+from PIL import Image, ImageCms, features
+
+ROOT = os.path.dirname(os.path.abspath(__file__))
+SOURCE_DIR = os.path.join(ROOT, "static", "images")
+IMAGE_CACHE_DIR = os.environ.get(
+    "IMAGE_CACHE_DIR", os.path.join(ROOT, "static", "derived")
+)
+
+WIDTHS = (180, 360, 720, 1280, 1920)
+# Part of every derivative's hash; bump when the resize/convert steps change
+PIPELINE_VERSION = 1
+
+# Preferred first; the last one is the <img> fallback
+ENCODERS = {
+    "avif": {"quality": 50},
+    "webp": {"quality": 75, "method": 4},
+    "jpeg": {"quality": 80, "optimize": True, "progressive": True},
+}
+MIME_TYPES = {"avif": "image/avif", "webp": "image/webp", "jpeg": "image/jpeg"}
+EXTENSIONS = {"avif": "avif", "webp": "webp", "jpeg": "jpg"}
+FORMATS = tuple(fmt for fmt in ENCODERS if fmt != "avif" or features.check("avif"))
+
+URL_PREFIX = "/images/"
+CACHE_CONTROL = "public, max-age=31536000, immutable"
+
+# <stem>.<hash>.<width>w.<extension>
+_DERIVED_NAME = re.compile(
+    r"^(?P<stem>.+)\.(?P<hash>[0-9a-f]{12})\.(?P<width>\d+)w\.(?P<ext>\w+)$"
+)
+
+_sources = {}  # file name -> (mtime, Source)
+_lock = threading.Lock()
+
+
+class Source:
+    def __init__(self, filename):
+        path = os.path.join(SOURCE_DIR, filename)
+        with open(path, "rb") as f:
+            digest = hashlib.sha256(f.read())
+        digest.update(repr((PIPELINE_VERSION, ENCODERS)).encode())
+        with Image.open(path) as image:
+            self.width, self.height = image.size
+
+        self.filename = filename
+        self.path = path
+        self.stem = os.path.splitext(filename)[0]
+        self.hash = digest.hexdigest()[:12]
+        # Never upscale: a narrower original gets its own width as the largest
+        self.widths = sorted({min(width, self.width) for width in WIDTHS})
+
+    def name(self, width, fmt):
+        return f"{self.stem}.{self.hash}.{width}w.{EXTENSIONS[fmt]}"
+
+    def srcset(self, fmt):
+        return ", ".join(
+            f"{URL_PREFIX}{self.name(width, fmt)} {width}w" for width in self.widths
+        )
+
+
+def source(filename):
+    """The (cached) ``Source`` for a file in static/images, or None."""
+    path = os.path.join(SOURCE_DIR, filename)
+    if os.path.dirname(os.path.normpath(path)) != SOURCE_DIR:
+        return None
+    try:
+        mtime = os.stat(path).st_mtime
+    except OSError:
+        return None
+
+    with _lock:
+        cached = _sources.get(filename)
+    if cached is None or cached[0] != mtime:
+        cached = (mtime, Source(filename))
+        with _lock:
+            _sources[filename] = cached
+    return cached[1]
+
+
+def _to_srgb(image):
+    # The SDG originals are CMYK print files; convert through their embedded
+    # profile, then drop it (and the other metadata), as it alone is ~550 KB
+    profile = image.info.get("icc_profile")
+    if profile and features.check("littlecms2"):
+        image = ImageCms.profileToProfile(
+            image,
+            ImageCms.ImageCmsProfile(io.BytesIO(profile)),
+            ImageCms.createProfile("sRGB"),
+            outputMode="RGB",
+        )
+    else:
+        image = image.convert("RGB")
+    image.info = {}
+    return image
+
+
+def generate(src, width, fmt):
+    """Write one derivative (if it isn't there yet) and return its path."""
+    path = os.path.join(IMAGE_CACHE_DIR, src.name(width, fmt))
+    if os.path.exists(path):
+        return path
+
+    os.makedirs(IMAGE_CACHE_DIR, exist_ok=True)
+    with Image.open(src.path) as image:
+        image.draft(image.mode, (width, width))  # lets JPEG decode at a reduced scale
+        height = round(image.height * width / image.width)
+        image = _to_srgb(image.resize((width, height), Image.Resampling.LANCZOS))
+
+        fd, temp_path = tempfile.mkstemp(dir=IMAGE_CACHE_DIR, suffix=".tmp")
+        try:
+            with os.fdopen(fd, "wb") as f:
+                image.save(f, fmt.upper(), **ENCODERS[fmt])
+            os.replace(temp_path, path)
+        except BaseException:
+            os.unlink(temp_path)
+            raise
+    return path
+
+
+def derived_path(name):
+    """
+    Path of the derivative called ``name``, generating it on first use. None if
+    the name doesn't match a current original at one of its widths.
+    """
+    match = _DERIVED_NAME.match(name)
+    if not match:
+        return None
+    path = os.path.join(IMAGE_CACHE_DIR, name)
+    if os.path.exists(path):
+        return path
+
+    fmt = next((fmt for fmt in FORMATS if EXTENSIONS[fmt] == match["ext"]), None)
+    src = next(
+        (
+            src
+            for src in map(source, _candidates(match["stem"]))
+            if src is not None and src.hash == match["hash"]
+        ),
+        None,
+    )
+    width = int(match["width"])
+    if fmt is None or src is None or width not in src.widths:
+        return None
+    return generate(src, width, fmt)
+
+
+def _candidates(stem):
+    return [
+        filename
+        for filename in os.listdir(SOURCE_DIR)
+        if os.path.splitext(filename)[0] == stem
+    ]
+
+
+def responsive_image(filename, alt="", sizes="100vw", **attributes):
+    """
+    ``<picture>`` markup for static/images/``filename``, with one ``<source>``
+    per format and a JPEG ``<img>`` fallback. Extra keyword arguments become
+    attributes of the ``<img>`` (``class_`` for class).
+    """
+    src = source(filename)
+    if src is None:
+        raise FileNotFoundError(filename)
+
+    attributes = {name.rstrip("_"): value for name, value in attributes.items()}
+    attributes.setdefault("loading", "lazy")
+    attributes.setdefault("decoding", "async")
+    extra = "".join(f' {name}="{escape(value)}"' for name, value in attributes.items())
+
+    fallback = FORMATS[-1]
+    sources = "".join(
+        f'<source type="{MIME_TYPES[fmt]}" srcset="{src.srcset(fmt)}" sizes="{escape(sizes)}">'
+        for fmt in FORMATS[:-1]
+    )
+    largest = src.widths[-1]
+    return Markup(
+        f'<picture class="responsive-image">{sources}'
+        f'<img src="{URL_PREFIX}{src.name(largest, fallback)}"'
+        f' srcset="{src.srcset(fallback)}" sizes="{escape(sizes)}"'
+        f' width="{largest}" height="{round(src.height * largest / src.width)}"'
+        f' alt="{escape(alt)}"{extra}></picture>'
+    )
+
+
+def build_all():
+    """Generate every derivative of every image in static/images."""
+    count = 0
+    for filename in sorted(os.listdir(SOURCE_DIR)):
+        src = source(filename)
+        if src is None:
+            continue
+        for fmt in FORMATS:
+            for width in src.widths:
+                generate(src, width, fmt)
+                count += 1
+    return count
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.parse_args()
+    count = build_all()
+    print(f"{count} derivatives in {IMAGE_CACHE_DIR} ({', '.join(FORMATS)})")
+
+
+if __name__ == "__main__":
+    main()
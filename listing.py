@@ -0,0 +1,255 @@
+"""
+Paginated, sortable, filterable project listing shared by the CRUD page and
+the main-campus views.
+
+Pages are fetched with keyset pagination on (sort column, projectid), so every
+page costs the same however deep the user goes: each sortable column has an
+index on (column, projectid), see migrations 0007 and 0008. Page cursors are
+opaque tokens that encode the sort, and the sort value and projectid of the
+row at the page edge.
+"""
+
+import base64
+import binascii
+import datetime
+import json
+
+DEFAULT_PAGE_SIZE = 25
+MAX_PAGE_SIZE = 200
+
+# Past this many matches the total is reported as an estimate ("10000+")
+COUNT_CAP = 10000
+
+# Sortable columns. They are ordered and sought by as they are (no ISNULL), so
+# the (column, projectid) indexes are used; NULLs are handled in the seek.
+SORT_COLUMNS = {
+    "projectid": "projectid",
+    "title": "title",
+    "leader": "leader",
+    # The typed date, not the free text ("April 2023" < "March 2022")
+    "projectdate": "projectdate_value",
+    "projectstatus": "projectstatus",
+    "collegecampus": "collegecampus",
+}
+
+# Filter name -> (SQL predicate, how to convert the query-string value)
+FILTERS = {
+    "status": ("projectstatus = ?", str),
+    "campus": ("collegecampus = ?", str),
+    "sdg": (
+        "EXISTS (SELECT 1 FROM dbo.ProjectSDG AS ps"
+        " WHERE ps.projectid = dbo.Projects.projectid AND ps.sdg = ?)",
+        int,
+    ),
+    "year": ("projectyear = ?", int),
+}
+
+
+def encode_cursor(sort, sort_value, projectid):
+    raw = json.dumps([sort, sort_value, projectid], default=str).encode("utf-8")
+    return base64.urlsafe_b64encode(raw).decode("ascii").rstrip("=")
+
+
+def decode_cursor(token, sort):
+    """
+    (sort value, projectid) from a token made for ``sort``; ValueError if it
+    isn't one of ours, or was made for another sort.
+    """
+    padded = token + "=" * (-len(token) % 4)
+    try:
+        value = json.loads(base64.urlsafe_b64decode(padded))
+    except (binascii.Error, UnicodeDecodeError, ValueError) as e:
+        raise ValueError(f"Invalid page cursor: {e}") from None
+    if not isinstance(value, list) or len(value) != 3 or value[0] != sort:
+        raise ValueError("Invalid page cursor")
+    _, sort_value, projectid = value
+    if type(projectid) is not int:
+        raise ValueError("Invalid page cursor")
+
+    # The value is compared with the sort column in SQL, so it has to be of
+    # the column's type; NULL is allowed for every column but projectid
+    if sort == "projectid":
+        valid = type(sort_value) is int
+    else:
+        valid = sort_value is None or isinstance(sort_value, str)
+    if not valid:
+        raise ValueError("Invalid page cursor")
+    if SORT_COLUMNS[sort] == "projectdate_value" and sort_value is not None:
+        sort_value = datetime.date.fromisoformat(sort_value)  # ValueError if not
+    return sort_value, projectid
+
+
+def _cursor_arg(args, name, sort):
+    # Like the filters, a token that doesn't decode is ignored
+    token = args.get(name) or None
+    if token is not None:
+        try:
+            decode_cursor(token, sort)
+        except ValueError:
+            return None
+    return token
+
+
+def parse_params(args, default_limit=DEFAULT_PAGE_SIZE):
+    """Read sort, order, filters, cursors and limit from request args."""
+    sort = args.get("sort", "projectid")
+    if sort not in SORT_COLUMNS:
+        sort = "projectid"
+
+    filters = {}
+    for name, (_, convert) in FILTERS.items():
+        value = args.get(name, "").strip()
+        if not value:
+            continue
+        try:
+            filters[name] = convert(value)
+        except ValueError:
+            continue
+
+    try:
+        limit = int(args.get("limit", default_limit))
+    except ValueError:
+        limit = default_limit
+
+    return {
+        "sort": sort,
+        "order": "desc" if args.get("order") == "desc" else "asc",
+        "filters": filters,
+        "after": _cursor_arg(args, "after", sort),
+        "before": _cursor_arg(args, "before", sort),
+        "limit": max(1, min(limit, MAX_PAGE_SIZE)),
+    }
+
+
+def _where(params):
+    clauses = []
+    values = []
+    for name, value in params["filters"].items():
+        clauses.append(FILTERS[name][0])
+        values.append(value)
+    return clauses, values
+
+
+def _count(cursor, clauses, values):
+    """Return (total, is_estimate)."""
+    if not clauses:
+        # Unfiltered: the row count SQL Server already keeps for the table
+        try:
+            cursor.execute("""
+                SELECT SUM(row_count)
+                FROM sys.dm_db_partition_stats
+                WHERE object_id = OBJECT_ID('dbo.Projects') AND index_id IN (0, 1)
+            """)
+            total = cursor.fetchone()[0]
+            if total is not None:
+                return int(total), True
+        except Exception:
+            pass  # needs VIEW DATABASE STATE; fall back to counting
+
+    where = f"WHERE {' AND '.join(clauses)}" if clauses else ""
+    cursor.execute(
+        f"SELECT COUNT(*) FROM (SELECT TOP (?) 1 AS hit FROM dbo.Projects {where}) AS capped",
+        [COUNT_CAP + 1] + values,
+    )
+    total = cursor.fetchone()[0]
+    if total > COUNT_CAP:
+        return COUNT_CAP, True
+    return total, False
+
+
+def _seek(column, descending, sort_value, projectid):
+    """
+    WHERE clause (and its parameters) for the rows after (sort_value, projectid)
+    in ``ORDER BY column, projectid``. SQL Server sorts NULLs first ascending
+    and last descending, and NULL never compares equal, so those get spelled
+    out; projectid is never NULL.
+    """
+    op = "<" if descending else ">"
+    if column == "projectid":
+        return f"projectid {op} ?", [projectid]
+
+    if sort_value is None:
+        seek = f"({column} IS NULL AND projectid {op} ?)"
+        params = [projectid]
+        if not descending:
+            seek += f" OR {column} IS NOT NULL"
+    else:
+        seek = f"{column} {op} ? OR ({column} = ? AND projectid {op} ?)"
+        params = [sort_value, sort_value, projectid]
+        if descending:
+            seek += f" OR {column} IS NULL"
+    return f"({seek})", params
+
+
+def fetch_page(cursor, columns, params):
+    """
+    Fetch one page of ``columns`` (projectid is always included).
+
+    Returns a dict with ``rows`` (list of dicts), ``next``/``prev`` cursor
+    tokens (None at either end), ``total`` and ``total_is_estimate``.
+    """
+    columns = list(dict.fromkeys(["projectid"] + list(columns)))
+    sort_expr = SORT_COLUMNS[params["sort"]]
+    descending = params["order"] == "desc"
+
+    clauses, values = _where(params)
+    total, total_is_estimate = _count(cursor, clauses, values)
+
+    # Walking backwards from a "before" cursor flips the order; rows are
+    # flipped back below so the page always reads in the requested order.
+    backwards = params["before"] is not None and params["after"] is None
+    token = params["before"] if backwards else params["after"]
+    forward_desc = descending != backwards
+
+    seek_clauses = list(clauses)
+    seek_values = list(values)
+    if token:
+        sort_value, projectid = decode_cursor(token, params["sort"])
+        seek, seek_params = _seek(sort_expr, forward_desc, sort_value, projectid)
+        seek_clauses.append(seek)
+        seek_values += seek_params
+
+    direction = "DESC" if forward_desc else "ASC"
+    where = f"WHERE {' AND '.join(seek_clauses)}" if seek_clauses else ""
+    cursor.execute(
+        f"""
+        SELECT TOP (?) {sort_expr} AS sort_value, {", ".join(columns)}
+        FROM dbo.Projects
+        {where}
+        ORDER BY {sort_expr} {direction}, projectid {direction}
+        """,
+        [params["limit"] + 1] + seek_values,
+    )
+    fetched = cursor.fetchall()
+
+    has_more = len(fetched) > params["limit"]
+    fetched = fetched[: params["limit"]]
+    if backwards:
+        fetched.reverse()
+
+    rows = [dict(zip(columns, row[1:])) for row in fetched]
+    edges = [(row[0], row[1]) for row in fetched]
+
+    sort = params["sort"]
+    if backwards:
+        prev_token = encode_cursor(sort, *edges[0]) if has_more and edges else None
+        next_token = encode_cursor(sort, *edges[-1]) if edges else None
+    else:
+        prev_token = encode_cursor(sort, *edges[0]) if token and edges else None
+        next_token = encode_cursor(sort, *edges[-1]) if has_more and edges else None
+
+    return {
+        "rows": rows,
+        "next": next_token,
+        "prev": prev_token,
+        "total": total,
+        "total_is_estimate": total_is_estimate,
+    }
+
+
+def page_args(params, **overrides):
+    """Query-string arguments for a link to another page of the same listing."""
+    args = {"sort": params["sort"], "order": params["order"], "limit": params["limit"]}
+    args.update(params["filters"])
+    args.update(overrides)
+    return {key: value for key, value in args.items() if value is not None}
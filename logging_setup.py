@@ -0,0 +1,126 @@
+"""
+Structured, non-blocking logging.
+
+Records are put on an in-memory queue by a ``QueueHandler`` and written to
+stdout as one JSON object per line by a background ``QueueListener``, so
+request threads never wait on stdout. Every line inside a request carries the
+request's ID (taken from an incoming X-Request-ID header or generated), which is
+echoed back in the response.
+
+Per-row debug output goes to the ``evsu.rows`` logger, which only lets through
+a sample of records (LOG_ROW_SAMPLE_RATE, default 1%).
+"""
+
+import atexit
+import copy
+import json
+import logging
+import logging.handlers
+import os
+import queue
+import random
+import sys
+import time
+import uuid
+
+from flask import g, has_request_context, request
+
+LOG_LEVEL = os.environ.get("LOG_LEVEL", "INFO").upper()
+LOG_ROW_SAMPLE_RATE = float(os.environ.get("LOG_ROW_SAMPLE_RATE", 0.01))
+
+# Attributes every LogRecord has; anything else was passed via ``extra=``
+_RECORD_ATTRS = set(vars(logging.makeLogRecord({}))) | {"message", "request_id"}
+
+
+class RequestIdFilter(logging.Filter):
+    def filter(self, record):
+        if not hasattr(record, "request_id"):
+            record.request_id = g.get("request_id") if has_request_context() else None
+        return True
+
+
+class SampleFilter(logging.Filter):
+    """Let through roughly ``rate`` of the records (warnings and up always pass)."""
+
+    def __init__(self, rate):
+        super().__init__()
+        self.rate = rate
+
+    def filter(self, record):
+        return record.levelno >= logging.WARNING or random.random() < self.rate
+
+
+class JsonFormatter(logging.Formatter):
+    def format(self, record):
+        entry = {
+            "ts": time.strftime("%Y-%m-%dT%H:%M:%S", time.gmtime(record.created))
+            + f".{int(record.msecs):03d}Z",
+            "level": record.levelname,
+            "logger": record.name,
+            "message": record.getMessage(),
+        }
+        if getattr(record, "request_id", None):
+            entry["request_id"] = record.request_id
+        for key, value in vars(record).items():
+            if key not in _RECORD_ATTRS:
+                entry[key] = value
+        if record.exc_info:
+            entry["exc_info"] = self.formatException(record.exc_info)
+        elif record.exc_text:
+            entry["exc_info"] = record.exc_text
+        return json.dumps(entry, default=str, ensure_ascii=False)
+
+
+class StructuredQueueHandler(logging.handlers.QueueHandler):
+    """
+    QueueHandler that keeps the traceback out of the message: it is rendered
+    to ``exc_text`` on the calling thread and emitted as its own JSON field.
+    """
+
+    def prepare(self, record):
+        record = copy.copy(record)
+        record.msg = record.getMessage()
+        record.args = None
+        if record.exc_info:
+            record.exc_text = logging.Formatter().formatException(record.exc_info)
+            record.exc_info = None
+        return record
+
+
+_listener = None
+
+
+def configure_logging(app):
+    """Route the root logger through the queue and tag records with request IDs."""
+    global _listener
+
+    if _listener is None:
+        records = queue.SimpleQueue()
+
+        stream = logging.StreamHandler(sys.stdout)
+        stream.setFormatter(JsonFormatter())
+        _listener = logging.handlers.QueueListener(
+            records, stream, respect_handler_level=True
+        )
+        _listener.start()
+        atexit.register(_listener.stop)
+
+        queue_handler = StructuredQueueHandler(records)
+        # Resolve request IDs on the request thread, before the record is queued
+        queue_handler.addFilter(RequestIdFilter())
+
+        root = logging.getLogger()
+        root.handlers[:] = [queue_handler]
+        root.setLevel(LOG_LEVEL)
+
+        logging.getLogger("evsu.rows").addFilter(SampleFilter(LOG_ROW_SAMPLE_RATE))
+
+    @app.before_request
+    def assign_request_id():
+        g.request_id = request.headers.get("X-Request-ID") or uuid.uuid4().hex
+
+    @app.after_request
+    def echo_request_id(response):
+        if g.get("request_id"):
+            response.headers["X-Request-ID"] = g.request_id
+        return response
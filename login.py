@@ -5,19 +5,60 @@ from flask import (
     redirect,
     url_for,
     session,
+    stream_with_context,
     jsonify,
     flash,
+    Response,
+    send_file,
 )
 from flask_sqlalchemy import SQLAlchemy
-from werkzeug.security import generate_password_hash, check_password_hash
+from markupsafe import Markup
+from sqlalchemy import select
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.pool import NullPool
 import pyodbc
-from datetime import datetime
-from collections import defaultdict
+import click
+import logging
+import math
 import os
 
+from cache import TTLCache
+from db_pool import ConnectionPool, PoolTimeout
+from http_cache import conditional_json, encode_body, json_response, make_etag
+from http_cache import negotiate_encoding, not_modified, streamed_json
+from logging_setup import configure_logging
+from routing import ReplicaRouter
+from serializers import RowSerializer
+from signals import projects_changed
+from stats import dashboard_stats
+import attachments
+import bulk
+import dates
+import events
+import listing
+import metrics
+import images
+import migrations
+import passwords
+import project_stream
+import sdgs
+import search
+import spatial
+import summary
+import versions
+
 
 app = Flask(__name__)
 
+# JSON log lines via a background queue listener; see logging_setup.py
+configure_logging(app)
+log = logging.getLogger("evsu")
+# Per-row debug output; only a sample of these records is emitted
+row_log = logging.getLogger("evsu.rows")
+
+# Per-route/per-query timings for /metrics (plus a Server-Timing header)
+metrics.instrument_app(app)
+
 # Database configuration from environment variables
 DB_DRIVER = os.environ.get("DB_DRIVER", "{ODBC Driver 17 for SQL Server}")
 DB_SERVER = os.environ.get("DB_SERVER", "localhost\\SQLEXPRESS")
@@ -26,34 +67,154 @@ DB_USER = os.environ.get("DB_USER", "")
 DB_PASSWORD = os.environ.get("DB_PASSWORD", "")
 DB_CONN_STRING = os.environ.get("DB_CONN_STRING", "")
 
-# Configure SQLAlchemy with connection string from environment variables
+# Build the ODBC connection string once; the pool and SQLAlchemy share it
 if DB_CONN_STRING:
-    app.config["SQLALCHEMY_DATABASE_URI"] = (
-        f"mssql+pyodbc:///?odbc_connect={DB_CONN_STRING}"
+    conn_str = DB_CONN_STRING
+elif DB_USER and DB_PASSWORD:
+    conn_str = f"DRIVER={DB_DRIVER};SERVER={DB_SERVER};DATABASE={DB_NAME};UID={DB_USER};PWD={DB_PASSWORD}"
+else:
+    conn_str = f"DRIVER={DB_DRIVER};SERVER={DB_SERVER};DATABASE={DB_NAME};Trusted_Connection=yes"
+
+# Connection pool settings (seconds for the timeouts)
+DB_POOL_SIZE = int(os.environ.get("DB_POOL_SIZE", 5))
+DB_POOL_TIMEOUT = float(os.environ.get("DB_POOL_TIMEOUT", 30))
+DB_POOL_IDLE_TIMEOUT = float(os.environ.get("DB_POOL_IDLE_TIMEOUT", 300))
+DB_POOL_RECYCLE = float(os.environ.get("DB_POOL_RECYCLE", 1800))
+DB_POOL_PING_AFTER = float(os.environ.get("DB_POOL_PING_AFTER", 30))
+# Connections /ready opens ahead of traffic
+DB_POOL_WARM = int(os.environ.get("DB_POOL_WARM", 2))
+
+# Optional read replica (e.g. an Azure SQL geo-replica, or the primary's
+# readable secondary with ApplicationIntent=ReadOnly); see routing.py
+DB_REPLICA_CONN_STRING = os.environ.get("DB_REPLICA_CONN_STRING", "")
+DB_REPLICA_MAX_LAG = float(os.environ.get("DB_REPLICA_MAX_LAG", 5))
+DB_REPLICA_CHECK_INTERVAL = float(os.environ.get("DB_REPLICA_CHECK_INTERVAL", 1))
+
+
+def make_pool(connection_string):
+    return ConnectionPool(
+        lambda: pyodbc.connect(connection_string),
+        size=DB_POOL_SIZE,
+        timeout=DB_POOL_TIMEOUT,
+        idle_timeout=DB_POOL_IDLE_TIMEOUT,
+        recycle=DB_POOL_RECYCLE,
+        ping_after=DB_POOL_PING_AFTER,
+        cursor_factory=metrics.InstrumentedCursor,
+        on_checkout=metrics.observe_checkout,
+    )
+
+
+pool = make_pool(conn_str)
+metrics.track_pool(pool)
+
+if DB_REPLICA_CONN_STRING:
+    replica_pool = make_pool(DB_REPLICA_CONN_STRING)
+    metrics.track_pool(replica_pool, "replica")
+    router = ReplicaRouter(
+        pool,
+        replica_pool,
+        max_lag=DB_REPLICA_MAX_LAG,
+        check_interval=DB_REPLICA_CHECK_INTERVAL,
     )
 else:
-    if DB_USER and DB_PASSWORD:
-        conn_str = f"DRIVER={DB_DRIVER};SERVER={DB_SERVER};DATABASE={DB_NAME};UID={DB_USER};PWD={DB_PASSWORD}"
-    else:
-        conn_str = f"DRIVER={DB_DRIVER};SERVER={DB_SERVER};DATABASE={DB_NAME};Trusted_Connection=yes"
+    replica_pool = router = None
 
-    app.config["SQLALCHEMY_DATABASE_URI"] = f"mssql+pyodbc:///?odbc_connect={conn_str}"
+# Nothing here touches the database at import: connections are opened on first
+# checkout (or by /ready), and tables are created by `flask migrate-db`, so a
+# worker boots in milliseconds and doesn't crash-loop while the DB is down.
 
+# SQLAlchemy borrows its connections from the same pool instead of keeping its own
+# (SQLALCHEMY_DATABASE_URI only picks the dialect, e.g. for the benchmark stand-in)
+app.config["SQLALCHEMY_DATABASE_URI"] = os.environ.get(
+    "SQLALCHEMY_DATABASE_URI", f"mssql+pyodbc:///?odbc_connect={conn_str}"
+)
+app.config["SQLALCHEMY_ENGINE_OPTIONS"] = {
+    "creator": pool.connect,
+    "poolclass": NullPool,
+}
 app.config["SQLALCHEMY_TRACK_MODIFICATIONS"] = False
 app.secret_key = os.environ.get("FLASK_SECRET_KEY", "your_secret_key")
 
 db = SQLAlchemy(app)
 
 
-def get_db_connection():
-    if DB_CONN_STRING:
-        return pyodbc.connect(DB_CONN_STRING)
-    elif DB_USER and DB_PASSWORD:
-        conn_str = f"DRIVER={DB_DRIVER};SERVER={DB_SERVER};DATABASE={DB_NAME};UID={DB_USER};PWD={DB_PASSWORD}"
-    else:
-        conn_str = f"DRIVER={DB_DRIVER};SERVER={DB_SERVER};DATABASE={DB_NAME};Trusted_Connection=yes"
+# Serialized /api/projects payloads; write endpoints clear it via projects_changed
+PROJECTS_CACHE_TTL = float(os.environ.get("PROJECTS_CACHE_TTL", 60))
+PROJECTS_CACHE_MAX_BYTES = int(
+    os.environ.get("PROJECTS_CACHE_MAX_BYTES", 32 * 1024 * 1024)
+)
+
+# Entries are (body, content encoding) tuples keyed on (etag, encoding)
+projects_cache = TTLCache(
+    ttl=PROJECTS_CACHE_TTL,
+    max_entries=64,
+    max_bytes=PROJECTS_CACHE_MAX_BYTES,
+    sizeof=lambda entry: len(entry[0]),
+)
+metrics.track_cache("projects", projects_cache)
+
+
+# Rendered dashboard fragments keyed on the dbo.Projects version, so a write in
+# any worker makes the next render miss; see render_dashboard()
+DASHBOARD_CACHE_TTL = float(os.environ.get("DASHBOARD_CACHE_TTL", 3600))
+dashboard_cache = TTLCache(ttl=DASHBOARD_CACHE_TTL, max_entries=4)
+metrics.track_cache("dashboard", dashboard_cache)
+
+
+@projects_changed.connect
+def invalidate_projects_cache(sender, **extra):
+    projects_cache.clear()
+    dashboard_cache.clear()
+
 
-    return pyodbc.connect(conn_str)
+# Change feed for open pages; see events.py and /events
+broadcaster = events.Broadcaster()
+
+
+@projects_changed.connect
+def publish_change(sender, projectid=None, action=None, version=None, **extra):
+    data = {"action": action, "projectid": projectid, "version": version}
+    if extra.get("project"):
+        data["project"] = extra["project"]
+    broadcaster.publish(action, data, version)
+
+
+@projects_changed.connect
+def pin_session_to_primary(sender, **extra):
+    # Read-your-writes: this session's next reads shouldn't miss its own change
+    if router is not None:
+        router.mark_written()
+
+
+def get_db_connection(readonly=False):
+    """
+    Check a connection out of the shared pool.
+
+    Use it as ``with get_db_connection() as conn:`` so the connection goes back
+    to the pool on every path, including early returns and exceptions.
+    ``readonly=True`` lets the query go to the read replica when one is
+    configured and fresh enough (see routing.py).
+    """
+    target = router.pool_for_read() if readonly and router is not None else pool
+    try:
+        return target.connect()
+    except PoolTimeout:
+        metrics.pool_timeouts.inc()
+        raise
+    except Exception:
+        if target is pool:
+            raise
+        log.exception("Replica checkout failed; reading from the primary")
+        return get_db_connection()
+
+
+def projects_version():
+    """Current dbo.TableVersions version of dbo.Projects."""
+    with get_db_connection(readonly=True) as conn:
+        cursor = conn.cursor()
+        version = versions.current(cursor, "Projects")
+        cursor.close()
+    return version
 
 
 class User(db.Model):
@@ -62,6 +223,40 @@ class User(db.Model):
     password = db.Column(db.String(255), nullable=False)
 
 
+# username -> (id, password hash) for login; only existing users are cached
+USER_CACHE_TTL = float(os.environ.get("USER_CACHE_TTL", 300))
+users_cache = TTLCache(ttl=USER_CACHE_TTL, max_entries=1024)
+metrics.track_cache("users", users_cache)
+
+
+def find_user(username):
+    """(id, password hash) for ``username``, or None if there is no such user."""
+    credentials = users_cache.get(username)
+    if credentials is None:
+        row = db.session.execute(
+            select(User.id, User.password).filter_by(username=username)
+        ).first()
+        if row is None:
+            return None
+        credentials = (row.id, row.password)
+        users_cache.set(username, credentials)
+    return credentials
+
+
+def upgrade_password_hash(username, user_id, password):
+    """Re-hash ``password`` with the current PASSWORD_HASH_METHOD and store it."""
+    try:
+        hashed_password = passwords.hash_password(password)
+        User.query.filter_by(id=user_id).update({"password": hashed_password})
+        db.session.commit()
+        users_cache.set(username, (user_id, hashed_password))
+        log.info("Upgraded password hash", extra={"user_id": user_id})
+    except Exception:
+        # The old hash still works; try again on the next login
+        db.session.rollback()
+        log.exception("Could not upgrade password hash", extra={"user_id": user_id})
+
+
 # Updated DB_CONFIG dictionary
 DB_CONFIG = {"driver": DB_DRIVER, "server": DB_SERVER, "database": DB_NAME}
 
@@ -72,10 +267,6 @@ if DB_USER and DB_PASSWORD:
 else:
     DB_CONFIG["trusted_connection"] = "yes"
 
-# Create database tables if they don't exist
-with app.app_context():
-    db.create_all()
-
 
 @app.route("/", methods=["GET", "POST"])
 @app.route("/login", methods=["GET", "POST"])
@@ -84,11 +275,21 @@ def login():
         username = request.form["username"]
         password = request.form["password"]
 
-        user = User.query.filter_by(username=username).first()
-
-        if user and check_password_hash(user.password, password):
-            session["user_id"] = user.id
-            print(user)
+        try:
+            user = find_user(username)
+            valid = user is not None and passwords.check_password(user[1], password)
+        except passwords.HashingBusy:
+            log.warning("Password hashing pool is full; turning a login away")
+            return render_template(
+                "index.html", error="The server is busy, please try again"
+            ), 503
+
+        if valid:
+            user_id, stored_hash = user
+            if passwords.needs_rehash(stored_hash):
+                upgrade_password_hash(username, user_id, password)
+            session["user_id"] = user_id
+            log.info("User logged in", extra={"user_id": user_id})
             return redirect(url_for("dashboard"))
         else:
             return render_template("index.html", error="Invalid username or password")
@@ -106,123 +307,78 @@ def signup():
         if password != confirm_password:
             return render_template("index.html", error="Passwords do not match")
 
-        if User.query.filter_by(username=username).first():
-            return render_template("index.html", error="Username already exists")
+        try:
+            hashed_password = passwords.hash_password(password)
+        except passwords.HashingBusy:
+            log.warning("Password hashing pool is full; turning a signup away")
+            return render_template(
+                "index.html", error="The server is busy, please try again"
+            ), 503
 
-        hashed_password = generate_password_hash(password)
-        new_user = User(username=username, password=hashed_password)
-        db.session.add(new_user)
-        db.session.commit()
+        # The unique constraint on username catches duplicates in the same round
+        # trip as the insert
+        db.session.add(User(username=username, password=hashed_password))
+        try:
+            db.session.commit()
+        except IntegrityError:
+            db.session.rollback()
+            return render_template("index.html", error="Username already exists")
 
         return redirect(url_for("login"))
 
     return render_template("index.html")
 
 
+def dashboard_fragments(stats):
+    """Render the parts of the dashboards that depend only on the data."""
+    counts = {
+        key: stats[key]
+        for key in ("total_projects", "completed_count", "in_progress_count")
+    }
+    charts = {
+        key: stats[key]
+        for key in (
+            "completed_count",
+            "in_progress_count",
+            "years",
+            "program_counts",
+            "collegecampus_labels",
+            "collegecampus_data",
+        )
+    }
+    return dict(
+        counts,
+        sdg_cards=Markup(render_template("_sdg_cards.html", **stats)),
+        chart_data=Markup(render_template("_dashboard_charts.html", charts=charts)),
+    )
+
+
+def render_dashboard(template):
+    """
+    Render dashboard.html or dashboard2.html. Both share the SDG cards and chart
+    payloads, which are rendered once per data version and cached.
+    """
+    with get_db_connection(readonly=True) as conn:
+        cursor = conn.cursor()
+        version = versions.current(cursor, "Projects")
+        fragments = dashboard_cache.get(version)
+        if fragments is None:
+            # SDG, status, campus and yearly rollups come from dbo.DashboardSummary
+            fragments = dashboard_fragments(dashboard_stats(cursor))
+            dashboard_cache.set(version, fragments)
+        cursor.close()
+
+    return render_template(template, **fragments)
+
+
 @app.route("/dashboard")
 def dashboard():
     if "user_id" in session:
         try:
-            conn = get_db_connection()
-            cursor = conn.cursor()
-
-            # Query to fetch all relevant SDG, project status, and college campus data
-            cursor.execute("""
-                SELECT sdg, projectstatus, collegecampus, projectdate
-                FROM dbo.Projects
-                WHERE sdg IS NOT NULL AND projectstatus IN ('Completed', 'In Progress')
-            """)
-
-            results = cursor.fetchall()
-
-            sdg_stats = {i: {"completed": 0, "in_progress": 0} for i in range(1, 18)}
-            total_projects = 0
-            completed_count = 0
-            in_progress_count = 0
-            collegecampus_counts = defaultdict(int)
-            yearly_programs = defaultdict(int)
-
-            print("Total rows in results:", len(results))
-
-            for row in results:
-                sdgs = row[0].split(",") if row[0] else []
-                projectstatus = row[1]
-                collegecampus = row[2]
-                projectdate = row[3]
-
-                print("Project Details:")
-                print(f"  SDGs: {sdgs}")
-                print(f"  Status: {projectstatus}")
-                print(f"  Campus: {collegecampus}")
-
-                total_projects += 1
-
-                # Process project status
-                if projectstatus == "Completed":
-                    completed_count += 1
-                elif projectstatus == "In Progress":
-                    in_progress_count += 1
-
-                # Process SDGs
-                for sdg in sdgs:
-                    if not sdg.strip():  # Skip empty SDG values
-                        continue
-                    try:
-                        sdg_number = int(sdg)  # Convert SDG to integer
-                    except ValueError:
-                        print(f"  Warning: Invalid SDG value: {sdg}")
-                        continue
-
-                    if projectstatus == "Completed":
-                        sdg_stats[sdg_number]["completed"] += 1
-                    elif projectstatus == "In Progress":
-                        sdg_stats[sdg_number]["in_progress"] += 1
-
-                # Count campus occurrences
-                collegecampus_counts[collegecampus] += 1
-
-                print("\nFinal Counts:")
-                print(f"Total Projects: {total_projects}")
-                print(f"Completed Projects: {completed_count}")
-                print(f"In Progress Projects: {in_progress_count}")
-
-                # Process project date and increment yearly counts
-                if projectdate:
-                    try:
-                        year = datetime.strptime(projectdate, "%B %Y").year
-                    except ValueError:
-                        try:
-                            year = datetime.strptime(projectdate, "%B %d, %Y").year
-                        except ValueError:
-                            continue
-                    yearly_programs[year] += 1
-
-            # Prepare data for charts
-            collegecampus_labels = list(collegecampus_counts.keys())
-            collegecampus_data = list(collegecampus_counts.values())
-            start_year = 2020
-            end_year = max(yearly_programs.keys(), default=start_year)
-            all_years = list(range(start_year, end_year + 1))
-
-            program_counts = [yearly_programs.get(year, 0) for year in all_years]
-
-            cursor.close()
-            conn.close()
-
-            return render_template(
-                "dashboard.html",
-                sdg_stats=sdg_stats,
-                total_projects=total_projects,
-                completed_count=completed_count,
-                in_progress_count=in_progress_count,
-                collegecampus_labels=collegecampus_labels,
-                collegecampus_data=collegecampus_data,
-                years=all_years,
-                program_counts=program_counts,
-            )
+            return render_dashboard("dashboard.html")
 
         except Exception as e:
-            print(f"Error fetching stats: {str(e)}")
+            log.exception("Error fetching dashboard stats")
             return jsonify({"status": "error", "message": str(e)}), 500
 
     else:
@@ -242,166 +398,291 @@ def is_logged_in():
 @app.route("/dashboard2")
 def dashboard2():
     try:
-        conn = get_db_connection()
-        cursor = conn.cursor()
-
-        # Query to fetch all relevant SDG, project status, and college campus data
-        cursor.execute(""" 
-            SELECT sdg, projectstatus, collegecampus, projectdate
-            FROM dbo.Projects
-            WHERE sdg IS NOT NULL AND projectstatus IN ('Completed', 'In Progress')
-        """)
-
-        # Fetch the results
-        results = cursor.fetchall()
-
-        # Initialize a dictionary to store the SDG counts
-        sdg_stats = {i: {"completed": 0, "in_progress": 0} for i in range(1, 18)}
-
-        # Initialize counters for overall counts
-        total_projects = 0
-        completed_count = 0
-        in_progress_count = 0
-
-        # Initialize a dictionary to store college campus counts for the doughnut chart
-        collegecampus_counts = defaultdict(int)
-
-        # Initialize a dictionary to store the number of projects per year for the line chart
-        yearly_programs = defaultdict(int)
-
-        # Process the results and count the occurrences of each SDG, project status, college campus, and project year
-        for row in results:
-            sdgs = row[0].split(",")  # Split the SDG field into individual SDGs
-            projectstatus = row[1]
-            collegecampus = row[2]
-            projectdate = row[3]
-
-            total_projects += 1  # Increment the total projects counter
-
-            # Count SDG status (Completed vs In Progress)
-            for sdg in sdgs:
-                if sdg.strip():  # Check if SDG is not empty
-                    try:
-                        sdg_number = int(sdg)  # Convert SDG to integer
-                    except ValueError:
-                        continue  # Skip if conversion fails (i.e., not a valid number)
-                    if projectstatus == "Completed":
-                        sdg_stats[sdg_number]["completed"] += 1
-                        completed_count += 1  # Increment completed counter
-                    elif projectstatus == "In Progress":
-                        sdg_stats[sdg_number]["in_progress"] += 1
-                        in_progress_count += 1  # Increment in-progress counter
-
-            # Count the college campus occurrences
-            if collegecampus.strip():  # Ensure college campus is not empty
-                collegecampus_counts[collegecampus] += 1
-
-            # Count the number of projects per year
-            if projectdate:  # Only process if the projectdate is not None or empty
-                try:
-                    # Try to extract the year from the project date (in format "March 2024")
-                    year = datetime.strptime(projectdate, "%B %Y").year
-                except ValueError:
-                    try:
-                        # Try another format for specific dates like 'March 14, 2022'
-                        year = datetime.strptime(projectdate, "%B %d, %Y").year
-                    except ValueError:
-                        continue  # Skip invalid date formats
-                yearly_programs[year] += 1  # Increment the count for that year
-
-        # Prepare data for the doughnut chart (College Campus)
-        collegecampus_labels = list(collegecampus_counts.keys())
-        collegecampus_data = list(collegecampus_counts.values())
-
-        # Prepare data for the line chart (Projects per year)
-        start_year = 2020
-        end_year = max(yearly_programs.keys(), default=start_year)
-        all_years = list(
-            range(start_year, end_year + 1)
-        )  # Ensure the range starts from 2020
-
-        program_counts = []
-        for year in all_years:
-            program_counts.append(
-                yearly_programs.get(year, 0)
-            )  # If the year has no data, default to 0
-
-        # Close the database connection
-        cursor.close()
-        conn.close()
-
-        # Pass the SDG stats, total counts, college campus data, and line chart data to the template
-        return render_template(
-            "dashboard2.html",
-            sdg_stats=sdg_stats,
-            total_projects=total_projects,
-            completed_count=completed_count,
-            in_progress_count=in_progress_count,
-            collegecampus_labels=collegecampus_labels,
-            collegecampus_data=collegecampus_data,
-            years=all_years,
-            program_counts=program_counts,
-        )
+        return render_dashboard("dashboard2.html")
 
     except Exception as e:
-        print(f"Error occurred in dashboard2 route: {str(e)}")
+        log.exception("Error in dashboard2 route")
         return jsonify({"status": "error", "message": str(e)}), 500
 
 
+# Listing pages link to each other with page_args(listing, after=..., before=...)
+app.jinja_env.globals["page_args"] = listing.page_args
+# <picture> with resized AVIF/WebP/JPEG srcsets for a file in static/images
+app.jinja_env.globals["responsive_image"] = images.responsive_image
+
+MAIN_CAMPUS_PAGE_SIZE = 24
+
+
+def list_programs(columns, default_limit=listing.DEFAULT_PAGE_SIZE):
+    """One page of dbo.Projects for the current request's sort/filter args."""
+    params = listing.parse_params(request.args, default_limit)
+    with get_db_connection(readonly=True) as conn:
+        cursor = conn.cursor()
+        page = listing.fetch_page(cursor, columns, params)
+        cursor.close()
+    return page, params
+
+
 @app.route("/main-campus")
 def main_campus():
     try:
-        conn = get_db_connection()
-        cursor = conn.cursor()
+        page, params = list_programs(["title", "leader"], MAIN_CAMPUS_PAGE_SIZE)
+        programs = page["rows"]
 
-        cursor.execute("SELECT projectid, title, leader FROM dbo.Projects")
-        programs = [
-            {"projectid": row[0], "title": row[1], "leader": row[2]}
-            for row in cursor.fetchall()
-        ]
-
-        print("Programs fetched:")
+        log.debug("Programs fetched", extra={"count": len(programs)})
         for program in programs:
-            print(f"Project ID: {program['projectid']}, Title: {program['title']}")
-
-        cursor.close()
-        conn.close()
+            row_log.debug(
+                "Program fetched",
+                extra={"projectid": program["projectid"], "title": program["title"]},
+            )
 
-        return render_template("main-campus.html", programs=programs)
+        return render_template(
+            "main-campus.html", programs=programs, page=page, listing=params
+        )
     except Exception as e:
-        print(f"Error in main_campus route: {str(e)}")
+        log.exception("Error in main_campus route")
         return f"An error occurred: {str(e)}", 500
 
 
 @app.route("/main-campus2")
 def main_campus2():
     try:
-        conn = get_db_connection()
-        cursor = conn.cursor()
+        page, params = list_programs(["title", "leader"], MAIN_CAMPUS_PAGE_SIZE)
+        programs = page["rows"]
 
-        cursor.execute("SELECT projectid, title, leader FROM dbo.Projects")
-        programs = [
-            {"projectid": row[0], "title": row[1], "leader": row[2]}
-            for row in cursor.fetchall()
-        ]
-
-        print("Programs fetched:")
+        log.debug("Programs fetched", extra={"count": len(programs)})
         for program in programs:
-            print(f"Project ID: {program['projectid']}, Title: {program['title']}")
-
-        cursor.close()
-        conn.close()
+            row_log.debug(
+                "Program fetched",
+                extra={"projectid": program["projectid"], "title": program["title"]},
+            )
 
-        return render_template("main-campus2.html", programs=programs)
+        return render_template(
+            "main-campus2.html", programs=programs, page=page, listing=params
+        )
     except Exception as e:
-        print(f"Error in main_campus route: {str(e)}")
+        log.exception("Error in main_campus2 route")
         return f"An error occurred: {str(e)}", 500
 
 
+def _int_arg(name, default=None, minimum=None, maximum=None):
+    value = request.args.get(name, type=int)
+    if value is None:
+        return default
+    if minimum is not None:
+        value = max(value, minimum)
+    if maximum is not None:
+        value = min(value, maximum)
+    return value
+
+
+def _flag_arg(name):
+    return request.args.get(name, "").lower() in ("1", "true", "yes", "on")
+
+
 @app.route("/api/projects")
 def get_projects():
-    projects = get_project_locations()
-    return jsonify(projects)
+    """
+    Geolocated projects for the map.
+
+    With no query parameters this is the full array of project objects (served
+    from projects_cache). ``after``/``limit`` switch to keyset pages on
+    projectid, and ``format=compact`` returns parallel marker arrays.
+    """
+    try:
+        etag = make_etag("projects", projects_version(), request.full_path)
+        response = not_modified(etag)
+        if response is not None:
+            return response
+
+        compact = request.args.get("format") == "compact"
+        paged = compact or "after" in request.args or "limit" in request.args
+        if paged:
+            after = _int_arg("after")
+            limit = _int_arg(
+                "limit",
+                project_stream.DEFAULT_PAGE_SIZE,
+                minimum=1,
+                maximum=project_stream.MAX_PAGE_SIZE,
+            )
+            if compact:
+                with get_db_connection(readonly=True) as conn:
+                    page = project_stream.compact_locations(conn, after, limit)
+                return conditional_json(etag, lambda: project_stream.compact_json(page))
+
+            # Stream the page; the connection goes back to the pool once it's sent
+            conn = get_db_connection(readonly=True)
+            try:
+                chunks = project_stream.stream_locations(conn, after, limit, paged=True)
+            except Exception:
+                conn.close()
+                raise
+            response = streamed_json(chunks, etag)
+            response.call_on_close(conn.close)
+            return response
+
+        encoding = negotiate_encoding()
+        body, encoding = projects_cache.get_or_set(
+            (etag, encoding), lambda: encode_body(all_project_locations(), encoding)
+        )
+        return json_response(body, etag, encoding)
+    except Exception:
+        log.exception("Error in get_project_locations")
+        return jsonify([])
+
+
+@app.route("/api/projects/bbox")
+def get_projects_in_bounds():
+    """Markers (or grid clusters when zoomed out) inside the map viewport."""
+    try:
+        west = float(request.args["west"])
+        south = float(request.args["south"])
+        east = float(request.args["east"])
+        north = float(request.args["north"])
+        zoom = int(request.args.get("zoom", spatial.CLUSTER_BELOW_ZOOM))
+        if not all(math.isfinite(value) for value in (west, south, east, north)):
+            raise ValueError("bounds must be finite")
+    except (KeyError, ValueError):
+        return jsonify(
+            {
+                "status": "error",
+                "message": "west, south, east and north must be numbers",
+            }
+        ), 400
+    if not spatial.MIN_ZOOM <= zoom <= spatial.MAX_ZOOM:
+        return jsonify(
+            {
+                "status": "error",
+                "message": f"zoom must be {spatial.MIN_ZOOM}-{spatial.MAX_ZOOM}",
+            }
+        ), 400
+
+    try:
+        with get_db_connection(readonly=True) as conn:
+            cursor = conn.cursor()
+            etag = make_etag(
+                "bbox", versions.current(cursor, "Projects"), request.full_path
+            )
+            response = not_modified(etag)
+            if response is not None:
+                return response
+
+            result = spatial.viewport(cursor, west, south, east, north, zoom)
+            cursor.close()
+
+        return conditional_json(etag, lambda: app.json.dumps(result).encode("utf-8"))
+    except Exception as e:
+        log.exception("Error in get_projects_in_bounds")
+        return jsonify({"status": "error", "message": str(e)}), 500
+
+
+search_index = search.SearchIndex()
+
+
+def load_search_rows():
+    with get_db_connection(readonly=True) as conn:
+        cursor = conn.cursor()
+        cursor.execute(search.INDEX_QUERY)
+        rows = cursor.fetchall()
+        cursor.close()
+    return rows
+
+
+@app.route("/api/search")
+def search_projects():
+    """Ranked top-N projects matching every word of ``q`` (prefixes allowed)."""
+    query = request.args.get("q", "").strip()
+    limit = _int_arg("limit", search.DEFAULT_LIMIT, minimum=1, maximum=search.MAX_LIMIT)
+    if len(query) < 2:
+        return jsonify([])
+
+    try:
+        version = projects_version()
+        etag = make_etag("search", version, request.full_path)
+        response = not_modified(etag)
+        if response is not None:
+            return response
+
+        # Rebuilt only when dbo.Projects has changed since the last build
+        search_index.ensure_current(version, load_search_rows)
+        results = search_index.search(query, limit)
+
+        return conditional_json(etag, lambda: app.json.dumps(results).encode("utf-8"))
+    except Exception as e:
+        log.exception("Error in search_projects")
+        return jsonify({"status": "error", "message": str(e)}), 500
+
+
+@app.route("/api/dashboard-stats")
+def get_dashboard_stats():
+    """The dashboards' counts and chart data, for patching an open page."""
+    try:
+        etag = make_etag("dashboard-stats", projects_version())
+        response = not_modified(etag)
+        if response is not None:
+            return response
+
+        with get_db_connection(readonly=True) as conn:
+            cursor = conn.cursor()
+            stats = dashboard_stats(cursor)
+            cursor.close()
+
+        return conditional_json(etag, lambda: app.json.dumps(stats).encode("utf-8"))
+    except Exception as e:
+        log.exception("Error in get_dashboard_stats")
+        return jsonify({"status": "error", "message": str(e)}), 500
+
+
+def _feed_version():
+    try:
+        return projects_version()
+    except Exception:
+        log.warning("Could not read the projects version for /events", exc_info=True)
+        return 0
+
+
+@app.route("/events")
+def project_events():
+    """
+    Server-sent project changes (see events.py). Resumes after the
+    ``Last-Event-ID`` header, or ``?last_event_id=`` for a fresh EventSource.
+    """
+    if request.method == "HEAD":
+        # Nothing would be streamed, so don't hold a slot for it
+        return Response(content_type=events.CONTENT_TYPE)
+
+    if not broadcaster.try_open():
+        # Not a 503: EventSource stops reconnecting after an error status
+        response = Response(events.BUSY, content_type=events.CONTENT_TYPE)
+        response.headers["Cache-Control"] = "no-cache"
+        return response
+
+    last_event_id = request.headers.get("Last-Event-ID") or request.args.get(
+        "last_event_id"
+    )
+    response = Response(
+        stream_with_context(events.stream(broadcaster, last_event_id, _feed_version)),
+        content_type=events.CONTENT_TYPE,
+    )
+    # Released when the response is closed; a generator's finally would not run
+    # for a body that is never iterated
+    response.call_on_close(broadcaster.close)
+    response.headers["Cache-Control"] = "no-cache"
+    # Stop nginx-style proxies from buffering the stream
+    response.headers["X-Accel-Buffering"] = "no"
+    return response
+
+
+@app.route("/api/cache-stats")
+def cache_stats():
+    return jsonify(
+        {
+            "projects": projects_cache.stats(),
+            "users": users_cache.stats(),
+            "dashboard": dashboard_cache.stats(),
+            "events": broadcaster.stats(),
+        }
+    )
 
 
 @app.route("/logout")
@@ -423,65 +704,58 @@ def map2():
     return render_template("map2.html")
 
 
+# Columns of the CRUD table (projectid is always included)
+CRUD_COLUMNS = [
+    "title",
+    "projectlocation",
+    "leader",
+    "projectdate",
+    "duration",
+    "projectstatus",
+]
+
+
 @app.route("/extension-program-management")
 def extension_program_management():
     try:
-        conn = get_db_connection()
-        cursor = conn.cursor()
+        page, params = list_programs(CRUD_COLUMNS)
 
-        cursor.execute("SELECT * FROM dbo.Projects")
-        columns = [column[0] for column in cursor.description]
-        programs = [dict(zip(columns, row)) for row in cursor.fetchall()]
-
-        cursor.close()
-        conn.close()
-
-        return render_template("crud.html", programs=programs)
+        return render_template(
+            "crud.html", programs=page["rows"], page=page, listing=params
+        )
 
     except Exception as e:
+        log.exception("Error in extension_program_management route")
         return f"An error occurred: {str(e)}", 500
 
 
-def get_project_locations():
+@app.route("/get-programs", methods=["GET"])
+def get_programs():
+    """
+    The CRUD table's rows as a JSON array, for refreshing it in place. Takes the
+    same sort, filter and cursor arguments as /extension-program-management.
+    """
     try:
-        conn = get_db_connection()
-        cursor = conn.cursor()
-
-        query = """
-        SELECT *
-        FROM dbo.Projects
-        WHERE x IS NOT NULL AND y IS NOT NULL
-        """
-
-        cursor.execute(query)
-        columns = [column[0] for column in cursor.description]
-        projects = []
+        etag = make_etag("programs", projects_version(), request.full_path)
+        response = not_modified(etag)
+        if response is not None:
+            return response
 
-        for row in cursor:
-            project = dict(zip(columns, row))
+        page, _ = list_programs(CRUD_COLUMNS)
+        rows = page["rows"]
+        serialize = RowSerializer(list(rows[0])) if rows else None
+        programs = [serialize(row.values()) for row in rows]
 
-            for key, value in project.items():
-                if isinstance(value, datetime):
-                    project[key] = value.strftime("%Y-%m-%d")
-                elif isinstance(value, (float, int)):
-                    project[key] = str(value)
-                elif value is None:
-                    project[key] = ""
-
-            project["lng"] = project.pop("x")
-            project["lat"] = project.pop("y")
-
-            if project.get("link"):
-                project["link"] = f"/static/pdfs/{project['link']}"
+        return conditional_json(etag, lambda: app.json.dumps(programs).encode("utf-8"))
+    except Exception as e:
+        log.exception("Error in get_programs")
+        return jsonify({"status": "error", "message": str(e)}), 500
 
-            projects.append(project)
 
-        cursor.close()
-        conn.close()
-        return projects
-    except Exception as e:
-        print(f"Error in get_project_locations: {str(e)}")
-        return []
+def all_project_locations():
+    """Serialized JSON array of every geolocated project."""
+    with get_db_connection(readonly=True) as conn:
+        return b"".join(project_stream.stream_locations(conn))
 
 
 # 2
@@ -492,142 +766,284 @@ def add_program():
         sdg_goals = request.form.getlist(
             "sdg[]"
         )  # Adjusting to handle multiple SDG values
-        if not sdg_goals:
-            print("SDG values are missing or empty.")
+        sdg_numbers = sdgs.parse(sdg_goals)
+        if not sdg_numbers:
+            log.warning("add_program rejected: no SDG values")
             return jsonify(
                 {"status": "error", "message": "No SDG values provided."}
             ), 400
         else:
-            sdg_string = ",".join(sdg_goals)  # Convert list to a comma-separated string
-            print(f"Received SDG values (backend): {sdg_string}")
+            sdg_string = sdgs.to_csv(sdg_numbers)  # Legacy comma-separated copy
+            log.debug("Received SDG values", extra={"sdg": sdg_string})
 
         # Database connection and insertion
-        conn = get_db_connection()
-        cursor = conn.cursor()
+        with get_db_connection() as conn:
+            cursor = conn.cursor()
 
-        # Generating a new project ID (adjusted for MSSQL)
-        new_project_id = cursor.execute(
-            "SELECT ISNULL(MAX(projectid), 0) + 1 FROM dbo.Projects"
-        ).fetchval()
-
-        data = {
-            "projectid": new_project_id,
-            "title": request.form.get("title"),
-            "projectlocation": request.form.get("projectlocation"),
-            "leader": request.form.get("leader"),
-            "assistant": request.form.get("assistant"),
-            "members": request.form.get("members"),
-            "projectdate": request.form.get("projectdate"),
-            "duration": request.form.get("duration"),
-            "projectstatus": request.form.get("projectstatus"),
-            "link": request.form.get("link"),
-            "x": request.form.get("x"),
-            "y": request.form.get("y"),
-            "sdg": sdg_string,  # Save the SDG values as a comma-separated string
-            "collegecampus": request.form.get("collegecampus"),
-        }
+            data = {
+                "title": request.form.get("title"),
+                "projectlocation": request.form.get("projectlocation"),
+                "leader": request.form.get("leader"),
+                "assistant": request.form.get("assistant"),
+                "members": request.form.get("members"),
+                "projectdate": request.form.get("projectdate"),
+                "projectdate_value": dates.parse_project_date(
+                    request.form.get("projectdate")
+                ),
+                "duration": request.form.get("duration"),
+                "projectstatus": request.form.get("projectstatus"),
+                "link": request.form.get("link"),
+                "x": request.form.get("x"),
+                "y": request.form.get("y"),
+                "sdg": sdg_string,  # Save the SDG values as a comma-separated string
+                "collegecampus": request.form.get("collegecampus"),
+            }
+
+            row_log.debug("Inserting project", extra={"project": data})
+
+            # Insert into the database; projectid comes from dbo.ProjectIdSeq
+            columns = ", ".join(data.keys())
+            placeholders = ", ".join(["?" for _ in data])
+            new_project_id = cursor.execute(
+                f"INSERT INTO dbo.Projects ({columns}) OUTPUT INSERTED.projectid"
+                f" VALUES ({placeholders})",
+                list(data.values()),
+            ).fetchval()
+            sdgs.replace_project_sdgs(cursor, new_project_id, sdg_numbers)
+            summary.add_project(cursor, new_project_id)
+            version = versions.bump(cursor, "Projects")
+            conn.commit()
 
-        print(f"Final Data sent to DB: {data}")  # Debugging Output
+            cursor.close()
 
-        # Insert into the database
-        columns = ", ".join(data.keys())
-        placeholders = ", ".join(["?" for _ in data])
-        cursor.execute(
-            f"INSERT INTO dbo.Projects ({columns}) VALUES ({placeholders})",
-            list(data.values()),
+        projects_changed.send(
+            app,
+            projectid=new_project_id,
+            action="add",
+            version=version,
+            project=events.compact_project(new_project_id, data),
+        )
+        return jsonify(
+            {
+                "status": "success",
+                "message": "Program added successfully",
+                "projectid": new_project_id,
+            }
         )
-        conn.commit()
 
-        cursor.close()
-        conn.close()
-        return jsonify({"status": "success", "message": "Program added successfully"})
+    except Exception as e:
+        log.exception("Error in add_program")
+        return jsonify({"status": "error", "message": str(e)}), 500
+
+
+@app.route("/import-projects", methods=["POST"])
+def import_projects():
+    """
+    Bulk-add projects from a CSV, JSON or JSON Lines file, uploaded as the
+    ``file`` form field or sent as the request body. Query args: ``format``,
+    ``batch_size``, ``skip_invalid`` and ``dry_run``.
+    """
+    if not is_logged_in():
+        return jsonify({"status": "error", "message": "Login required"}), 401
+
+    upload = request.files.get("file")
+    try:
+        fmt = bulk.detect_format(
+            request.args.get("format"),
+            upload.filename if upload else None,
+            request.mimetype,
+        )
+    except ValueError as e:
+        return jsonify({"status": "error", "message": str(e)}), 400
+
+    try:
+        records = bulk.read_rows(upload.stream if upload else request.stream, fmt)
+        with get_db_connection() as conn:
+            result = bulk.import_projects(
+                conn,
+                records,
+                batch_size=_int_arg(
+                    "batch_size", bulk.DEFAULT_BATCH_SIZE, 1, bulk.MAX_BATCH_SIZE
+                ),
+                skip_invalid=_flag_arg("skip_invalid"),
+                dry_run=_flag_arg("dry_run"),
+            )
+
+        if result["committed"]:
+            projects_changed.send(
+                app, projectid=None, action="import", version=result["version"]
+            )
+            message = f"Imported {result['inserted']} programs"
+        elif result["dry_run"]:
+            message = f"{result['inserted']} valid rows, {result['invalid']} invalid"
+        elif result["invalid"]:
+            message = f"Nothing imported: {result['invalid']} invalid rows"
+        else:
+            message = "Nothing imported: the file has no rows"
+
+        ok = result["committed"] or (result["dry_run"] and not result["invalid"])
+        return jsonify(
+            {"status": "success" if ok else "error", "message": message, **result}
+        ), 200 if ok else 422
 
     except Exception as e:
-        print(f"Error: {e}")
+        log.exception("Error in import_projects")
         return jsonify({"status": "error", "message": str(e)}), 500
 
 
-# 3
-@app.route("/get-program/<int:projectid>", methods=["GET"])
-def get_program(projectid):
+@app.route("/export-projects")
+def export_projects():
+    """All of dbo.Projects as CSV (default), JSON or JSON Lines, streamed."""
+    if not is_logged_in():
+        return jsonify({"status": "error", "message": "Login required"}), 401
+
     try:
-        conn = get_db_connection()
+        fmt = bulk.detect_format(request.args.get("format", "csv"))
+    except ValueError as e:
+        return jsonify({"status": "error", "message": str(e)}), 400
+
+    try:
+        # The connection goes back to the pool once the download is sent
+        conn = get_db_connection(readonly=True)
+        try:
+            chunks = bulk.export_projects(conn, fmt)
+        except Exception:
+            conn.close()
+            raise
+        response = Response(chunks, content_type=bulk.CONTENT_TYPES[fmt])
+        extension = "jsonl" if fmt == "ndjson" else fmt
+        response.headers["Content-Disposition"] = (
+            f'attachment; filename="projects.{extension}"'
+        )
+        response.call_on_close(conn.close)
+        return response
+    except Exception as e:
+        log.exception("Error in export_projects")
+        return jsonify({"status": "error", "message": str(e)}), 500
+
+
+def project_json(projectid, etag_name):
+    """
+    Conditional JSON response for one project with its SDGs, or None if there
+    is no such project.
+    """
+    with get_db_connection(readonly=True) as conn:
         cursor = conn.cursor()
 
-        # Fetch the project by its ID
-        cursor.execute("SELECT * FROM dbo.Projects WHERE projectid=?", projectid)
-        columns = [column[0] for column in cursor.description]
-        project = cursor.fetchone()
+        # Answer from the browser's copy if the table hasn't changed since
+        etag = make_etag(etag_name, versions.current(cursor, "Projects"), projectid)
+        response = not_modified(etag)
+        if response is not None:
+            return response
 
+        # Fetch the project by its ID, with its SDGs from dbo.ProjectSDG
+        cursor.execute(sdgs.PROJECT_WITH_SDGS, projectid)
+        row = cursor.fetchone()
+        project = RowSerializer.for_cursor(cursor)(row) if row else None
         cursor.close()
-        conn.close()
-
-        if project:
-            project_dict = dict(zip(columns, project))
-
-            # Process fields for proper formatting
-            for key, value in project_dict.items():
-                if isinstance(value, datetime):
-                    project_dict[key] = value.strftime(
-                        "%Y-%m-%d"
-                    )  # Format datetime to 'YYYY-MM-DD'
-                elif value is None:
-                    project_dict[key] = ""
-                elif key == "sdg" and value:
-                    # Ensure SDG is returned as a clean comma-separated string
-                    project_dict[key] = ",".join(
-                        [sdg.strip() for sdg in value.split(",") if sdg.strip()]
-                    )
-
-            # Debugging: Log the processed project details
-            print("Processed program details:", project_dict)
-
-            return jsonify(project_dict)
-        else:
+
+    if project is None:
+        return None
+
+    row_log.debug("Returning project", extra={"project": project})
+    return conditional_json(etag, lambda: app.json.dumps(project).encode("utf-8"))
+
+
+# 3
+@app.route("/get-program/<int:projectid>", methods=["GET"])
+def get_program(projectid):
+    try:
+        response = project_json(projectid, "program")
+        if response is None:
             return jsonify({"status": "error", "message": "Project not found"}), 404
+        return response
 
     except Exception as e:
-        print(f"Error in get_program: {e}")  # Debugging output
+        log.exception("Error in get_program", extra={"projectid": projectid})
         return jsonify({"status": "error", "message": str(e)}), 500
 
 
 # 4
 @app.route("/project-details/<int:projectid>", methods=["GET"])
 def project_details(projectid):
-    print(f"Received project ID: {projectid}")
-
     try:
-        conn = get_db_connection()
-        cursor = conn.cursor()
+        response = project_json(projectid, "project-details")
+        if response is None:
+            log.info("Project not found", extra={"projectid": projectid})
+            return jsonify({"status": "error", "message": "Project not found"}), 404
+        return response
 
-        query = "SELECT * FROM dbo.Projects WHERE projectid=?"
-        print(f"Executing query: {query} with projectid: {projectid}")
+    except Exception as e:
+        log.exception("Error fetching project details", extra={"projectid": projectid})
+        return jsonify({"status": "error", "message": str(e)}), 500
 
-        cursor.execute(query, (projectid,))
-        columns = [column[0] for column in cursor.description]
 
-        project = cursor.fetchone()
+def _project_id(value):
+    # Integers or digit strings only: int() would also take 1.9 and true
+    if type(value) is int:
+        return value
+    if isinstance(value, str) and value.strip().isdigit():
+        return int(value)
+    raise ValueError(f"Not a project ID: {value!r}")
 
-        cursor.close()
-        conn.close()
 
-        if project:
-            project_dict = dict(zip(columns, project))
+@app.route("/api/projects/batch", methods=["GET", "POST"])
+def get_projects_batch():
+    """
+    Several projects with their SDGs from a single ``IN (...)`` query. IDs come
+    from ``?ids=1,2,3`` or a JSON body ``{"ids": [1, 2, 3]}``. The response has
+    the projects in the order asked for, plus the IDs that were not found.
+    """
+    if request.method == "POST":
+        body = request.get_json(silent=True)
+        raw_ids = body.get("ids") if isinstance(body, dict) else None
+        if not isinstance(raw_ids, list):
+            return jsonify(
+                {"status": "error", "message": 'Expected {"ids": [...]}'}
+            ), 400
+    else:
+        raw_ids = [value for value in request.args.get("ids", "").split(",") if value]
+
+    try:
+        ids = list(dict.fromkeys(_project_id(value) for value in raw_ids))
+    except (TypeError, ValueError):
+        return jsonify({"status": "error", "message": "ids must be integers"}), 400
+    if not ids:
+        return jsonify({"status": "error", "message": "No project IDs given"}), 400
+    if len(ids) > sdgs.MAX_BATCH_IDS:
+        return jsonify(
+            {
+                "status": "error",
+                "message": f"At most {sdgs.MAX_BATCH_IDS} IDs per request",
+            }
+        ), 400
 
-            for key, value in project_dict.items():
-                if isinstance(value, datetime):
-                    project_dict[key] = value.strftime("%Y-%m-%d")
-                elif value is None:
-                    project_dict[key] = ""
+    try:
+        with get_db_connection(readonly=True) as conn:
+            cursor = conn.cursor()
 
-            print(f"Returning project: {project_dict}")
-            return jsonify(project_dict)
-        else:
-            print(f"No project found for ID: {projectid}")
-            return jsonify({"status": "error", "message": "Project not found"}), 404
+            etag = make_etag(
+                "programs-batch", versions.current(cursor, "Projects"), *ids
+            )
+            if request.method == "GET":
+                response = not_modified(etag)
+                if response is not None:
+                    return response
+
+            cursor.execute(sdgs.projects_with_sdgs(len(ids)), ids)
+            serialize = RowSerializer.for_cursor(cursor)
+            projects = [serialize(row) for row in cursor.fetchall()]
+            cursor.close()
+
+        found = {project["projectid"]: project for project in projects}
+        result = {
+            "projects": [found[projectid] for projectid in ids if projectid in found],
+            "missing": [projectid for projectid in ids if projectid not in found],
+        }
+        return conditional_json(etag, lambda: app.json.dumps(result).encode("utf-8"))
 
     except Exception as e:
-        print(f"Error fetching project details: {str(e)}")
+        log.exception("Error in get_projects_batch")
         return jsonify({"status": "error", "message": str(e)}), 500
 
 
@@ -635,56 +1051,79 @@ def project_details(projectid):
 @app.route("/edit-program/<int:projectid>", methods=["PUT"])
 def edit_program(projectid):
     try:
-        conn = get_db_connection()
-        cursor = conn.cursor()
-
-        # Get SDG values from the form
+        # Get SDG values from the form; none at all leaves the tags unchanged
         sdg_goals = request.form.getlist("sdg[]")
-        sdg_string = ",".join(sdg_goals) if sdg_goals else None
-
-        # Prepare the update data
-        data = {
-            "title": request.form.get("title"),
-            "projectlocation": request.form.get("projectlocation"),
-            "leader": request.form.get("leader"),
-            "assistant": request.form.get("assistant"),
-            "members": request.form.get("members"),
-            "projectdate": request.form.get("projectdate"),
-            "duration": request.form.get("duration"),
-            "projectstatus": request.form.get("projectstatus"),
-            "link": request.form.get("link"),
-            "x": request.form.get("x"),
-            "y": request.form.get("y"),
-            "sdg": sdg_string,
-            "collegecampus": request.form.get("collegecampus"),
-        }
-
-        # Remove None values
-        data = {k: v for k, v in data.items() if v is not None}
-
-        # Build the UPDATE query
-        set_clause = ", ".join([f"{key} = ?" for key in data.keys()])
-        query = f"UPDATE dbo.Projects SET {set_clause} WHERE projectid = ?"
-
-        # Add the projectid to the values
-        values = list(data.values()) + [projectid]
+        sdg_numbers = sdgs.parse(sdg_goals) if sdg_goals else None
+        if sdg_goals and not sdg_numbers:
+            log.warning("edit_program rejected: no valid SDG values")
+            return jsonify(
+                {"status": "error", "message": "No SDG values provided."}
+            ), 400
+        sdg_string = sdgs.to_csv(sdg_numbers) if sdg_goals else None
 
-        # Execute the update
-        cursor.execute(query, values)
+        with get_db_connection() as conn:
+            cursor = conn.cursor()
 
-        if cursor.rowcount == 0:
-            return jsonify(
-                {"status": "error", "message": "No program found with the given ID"}
-            ), 404
+            # Prepare the update data
+            data = {
+                "title": request.form.get("title"),
+                "projectlocation": request.form.get("projectlocation"),
+                "leader": request.form.get("leader"),
+                "assistant": request.form.get("assistant"),
+                "members": request.form.get("members"),
+                "projectdate": request.form.get("projectdate"),
+                "duration": request.form.get("duration"),
+                "projectstatus": request.form.get("projectstatus"),
+                "link": request.form.get("link"),
+                "x": request.form.get("x"),
+                "y": request.form.get("y"),
+                "sdg": sdg_string,
+                "collegecampus": request.form.get("collegecampus"),
+            }
+
+            # Remove None values
+            data = {k: v for k, v in data.items() if v is not None}
+
+            # Keep the typed date column in step with the free-text one
+            if "projectdate" in data:
+                projectdate = data["projectdate"]
+                data["projectdate_value"] = dates.parse_project_date(projectdate)
+
+            # Build the UPDATE query
+            set_clause = ", ".join([f"{key} = ?" for key in data.keys()])
+            query = f"UPDATE dbo.Projects SET {set_clause} WHERE projectid = ?"
+
+            # Add the projectid to the values
+            values = list(data.values()) + [projectid]
+
+            if not summary.lock_project(cursor, projectid):
+                return jsonify(
+                    {"status": "error", "message": "No program found with the given ID"}
+                ), 404
+
+            # Execute the update, swapping the project's old summary counts for its new ones
+            summary.remove_project(cursor, projectid)
+            cursor.execute(query, values)
+
+            if sdg_numbers is not None:
+                sdgs.replace_project_sdgs(cursor, projectid, sdg_numbers)
+            summary.add_project(cursor, projectid)
+            version = versions.bump(cursor, "Projects")
+            conn.commit()
+            cursor.close()
 
-        conn.commit()
-        cursor.close()
-        conn.close()
+        projects_changed.send(
+            app,
+            projectid=projectid,
+            action="edit",
+            version=version,
+            project=events.compact_project(projectid, data),
+        )
 
         return jsonify({"status": "success", "message": "Program updated successfully"})
 
     except Exception as e:
-        print(f"Error in edit_program: {str(e)}")
+        log.exception("Error in edit_program", extra={"projectid": projectid})
         return jsonify({"status": "error", "message": str(e)}), 500
 
 
@@ -692,30 +1131,206 @@ def edit_program(projectid):
 @app.route("/delete-program/<int:projectid>", methods=["DELETE"])
 def delete_program(projectid):
     try:
-        conn = get_db_connection()
-        cursor = conn.cursor()
+        with get_db_connection() as conn:
+            cursor = conn.cursor()
 
-        cursor.execute("SELECT COUNT(*) FROM dbo.Projects WHERE projectid=?", projectid)
-        project_exists = cursor.fetchone()[0] > 0
+            if not summary.lock_project(cursor, projectid):
+                return jsonify({"status": "error", "message": "Project not found"}), 404
+            summary.remove_project(cursor, projectid)
+            sdgs.delete_project_sdgs(cursor, projectid)
+            cursor.execute("DELETE FROM dbo.Projects WHERE projectid=?", projectid)
+            version = versions.bump(cursor, "Projects")
 
-        if not project_exists:
-            return jsonify({"status": "error", "message": "Project not found"}), 404
-        cursor.execute("DELETE FROM dbo.Projects WHERE projectid=?", projectid)
+            conn.commit()
+            cursor.close()
 
-        conn.commit()
-        cursor.close()
-        conn.close()
+        projects_changed.send(
+            app, projectid=projectid, action="delete", version=version
+        )
         return jsonify({"status": "success", "message": "Program deleted successfully"})
     except Exception as e:
+        log.exception("Error in delete_program", extra={"projectid": projectid})
         return jsonify({"status": "error", "message": str(e)}), 500
 
 
+@app.cli.command("migrate-db")
+def migrate_db_command():
+    """Create the SQLAlchemy tables and apply pending schema migrations."""
+    db.create_all()
+    with get_db_connection() as conn:
+        applied = migrations.migrate(conn)
+
+    for name in applied:
+        click.echo(f"Applied {name}")
+    if not applied:
+        click.echo("Database schema is up to date")
+
+
+@app.cli.command("backfill-sdgs")
+def backfill_sdgs_command():
+    """Rebuild dbo.ProjectSDG from the comma-separated dbo.Projects.sdg column."""
+    with get_db_connection() as conn:
+        rows = sdgs.backfill(conn)
+        summary.rebuild(conn)
+
+    click.echo(f"dbo.ProjectSDG backfilled ({rows} rows); dashboard summary rebuilt")
+
+
+@app.cli.command("backfill-dates")
+@click.option("--all", "all_rows", is_flag=True, help="Re-parse rows already parsed.")
+def backfill_dates_command(all_rows):
+    """Parse dbo.Projects.projectdate into the typed projectdate_value column."""
+    with get_db_connection() as conn:
+        updated, unparseable = dates.backfill(conn, only_missing=not all_rows)
+        summary.rebuild(conn)
+
+    click.echo(f"Parsed {updated} project dates; dashboard summary rebuilt")
+    if unparseable:
+        click.echo(f"{len(unparseable)} unparseable projectdate values:")
+        for text, projectids in sorted(unparseable.items()):
+            ids = ", ".join(str(projectid) for projectid in projectids)
+            click.echo(f"  {text!r}: projects {ids}")
+
+
+@app.cli.command("import-projects")
+@click.argument("path", type=click.Path(exists=True, dir_okay=False))
+@click.option("--format", "fmt", type=click.Choice(bulk.FORMATS), default=None)
+@click.option("--batch-size", default=bulk.DEFAULT_BATCH_SIZE, show_default=True)
+@click.option("--skip-invalid", is_flag=True, help="Import the valid rows anyway.")
+@click.option("--dry-run", is_flag=True, help="Validate only.")
+def import_projects_command(path, fmt, batch_size, skip_invalid, dry_run):
+    """Bulk-add projects from a CSV, JSON or JSON Lines file."""
+    fmt = bulk.detect_format(fmt, path)
+    with open(path, "rb") as stream, get_db_connection() as conn:
+        result = bulk.import_projects(
+            conn,
+            bulk.read_rows(stream, fmt),
+            batch_size=min(max(batch_size, 1), bulk.MAX_BATCH_SIZE),
+            skip_invalid=skip_invalid,
+            dry_run=dry_run,
+        )
+
+    for error in result["errors"]:
+        click.echo(f"  row {error['row']}: {error['error']}")
+    if result["committed"]:
+        projects_changed.send(
+            app, projectid=None, action="import", version=result["version"]
+        )
+        click.echo(f"Imported {result['inserted']} programs")
+    elif dry_run:
+        click.echo(f"{result['inserted']} valid rows, {result['invalid']} invalid")
+    else:
+        raise click.ClickException(
+            f"Nothing imported ({result['invalid']} invalid rows)"
+        )
+
+
+@app.cli.command("export-projects")
+@click.argument("output", type=click.File("wb"), default="-")
+@click.option("--format", "fmt", type=click.Choice(bulk.FORMATS), default="csv")
+def export_projects_command(output, fmt):
+    """Write every project to OUTPUT (default stdout)."""
+    with get_db_connection() as conn:
+        for chunk in bulk.export_projects(conn, fmt):
+            output.write(chunk)
+
+
+@app.cli.command("rebuild-summary")
+def rebuild_summary_command():
+    """Recompute dbo.DashboardSummary from dbo.Projects."""
+    with get_db_connection() as conn:
+        rows = summary.rebuild(conn)
+
+    click.echo(f"Dashboard summary rebuilt ({rows} rows)")
+
+
+@app.route("/attachments", methods=["POST"])
+def upload_attachment():
+    """
+    Store a PDF sent as the request body (streamed, so chunked transfer
+    encoding works) or as the ``file`` form field. Returns the ``link`` value
+    to save on a project.
+    """
+    if not is_logged_in():
+        return jsonify({"status": "error", "message": "Login required"}), 401
+
+    upload = request.files.get("file")
+    try:
+        name, size, created = attachments.store(
+            upload.stream if upload else request.stream
+        )
+    except attachments.AttachmentError as e:
+        return jsonify({"status": "error", "message": str(e)}), e.status
+    except Exception as e:
+        log.exception("Error in upload_attachment")
+        return jsonify({"status": "error", "message": str(e)}), 500
+
+    log.info(
+        "Stored attachment",
+        extra={"attachment": name, "bytes": size, "new_file": created},
+    )
+    return jsonify(
+        {
+            "status": "success",
+            "link": name,
+            "url": url_for("get_attachment", name=name),
+            "size": size,
+            "deduplicated": not created,
+        }
+    ), 201 if created else 200
+
+
+@app.route("/attachments/<name>")
+def get_attachment(name):
+    response = attachments.send_attachment(name, request.args.get("filename"))
+    if response is None:
+        return jsonify({"status": "error", "message": "Attachment not found"}), 404
+    return response
+
+
+@app.route("/images/<name>")
+def derived_image(name):
+    """Resized image made by images.py; generated on first request if need be."""
+    path = images.derived_path(name)
+    if path is None:
+        return jsonify({"status": "error", "message": "Image not found"}), 404
+
+    response = send_file(path, conditional=True, etag=True, max_age=None)
+    response.headers["Cache-Control"] = images.CACHE_CONTROL
+    return response
+
+
 # Add a health check endpoint for Render
 @app.route("/health")
 def health_check():
     return jsonify({"status": "healthy"}), 200
 
 
+@app.route("/ready")
+def readiness_check():
+    """
+    Readiness probe: opens DB_POOL_WARM pooled connections if they aren't open
+    yet and runs a trivial query, so traffic only arrives once the database
+    answers. /health stays a liveness check that never touches the database.
+    """
+    try:
+        opened = pool.warm(DB_POOL_WARM)
+        with get_db_connection() as conn:
+            cursor = conn.cursor()
+            cursor.execute("SELECT 1").fetchone()
+            cursor.close()
+    except Exception as e:
+        log.warning("Readiness check failed", extra={"error": str(e)})
+        return jsonify({"status": "unavailable", "message": str(e)}), 503
+
+    return jsonify({"status": "ready", "opened": opened, "pool": pool.status()}), 200
+
+
+@app.route("/metrics")
+def prometheus_metrics():
+    return Response(metrics.render(), content_type=metrics.CONTENT_TYPE)
+
+
 if __name__ == "__main__":
     # Use the PORT environment variable provided by Render
     port = int(os.environ.get("PORT", 5000))
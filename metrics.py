@@ -0,0 +1,427 @@
+"""
+Request, query, pool and cache instrumentation, exposed as Prometheus text.
+
+- ``instrument_app(app)`` times every request (per route rule, method and
+  status), the database time spent inside it and each template render, and
+  adds a ``Server-Timing`` header so the split shows up in browser dev tools.
+- ``InstrumentedCursor`` wraps pyodbc cursors (see ``ConnectionPool``'s
+  ``cursor_factory``) and times execute and fetch calls per route and SQL verb,
+  counting rows. Queries slower than SLOW_QUERY_SECONDS are logged.
+- ``observe_checkout`` records how long checkouts waited on the pool.
+
+Metrics live in process memory, so under gunicorn each worker reports its own.
+"""
+
+import logging
+import os
+import threading
+import time
+
+from flask import before_render_template, g, has_request_context, request
+from flask import template_rendered
+
+SLOW_QUERY_SECONDS = float(os.environ.get("SLOW_QUERY_SECONDS", 0.5))
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+FAST_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 1.0)
+
+# First SQL keyword -> "operation" label; anything else is reported as OTHER
+SQL_OPERATIONS = {"SELECT", "INSERT", "UPDATE", "DELETE", "MERGE", "WITH", "EXEC"}
+
+log = logging.getLogger("evsu.sql")
+
+_registry = []
+
+
+def _format_labels(names, values, extra=()):
+    pairs = list(zip(names, values)) + list(extra)
+    if not pairs:
+        return ""
+    escaped = (
+        (name, str(value).replace("\\", "\\\\").replace('"', '\\"'))
+        for name, value in pairs
+    )
+    return "{" + ",".join(f'{name}="{value}"' for name, value in escaped) + "}"
+
+
+def _format_value(value):
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class Counter:
+    kind = "counter"
+
+    def __init__(self, name, help, labels=()):
+        self.name = name
+        self.help = help
+        self.labels = tuple(labels)
+        self._values = {}
+        self._lock = threading.Lock()
+        _registry.append(self)
+
+    def inc(self, amount=1, **labels):
+        key = tuple(labels.get(name, "") for name in self.labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def samples(self):
+        with self._lock:
+            values = dict(self._values)
+        for key, value in sorted(values.items()):
+            yield self.name, _format_labels(self.labels, key), value
+
+
+class Histogram:
+    kind = "histogram"
+
+    def __init__(self, name, help, labels=(), buckets=DEFAULT_BUCKETS):
+        self.name = name
+        self.help = help
+        self.labels = tuple(labels)
+        self.buckets = tuple(buckets)
+        self._values = {}
+        self._lock = threading.Lock()
+        _registry.append(self)
+
+    def observe(self, value, **labels):
+        key = tuple(labels.get(name, "") for name in self.labels)
+        with self._lock:
+            series = self._values.get(key)
+            if series is None:
+                # [per-bucket counts..., sum, count]
+                series = self._values[key] = [0] * len(self.buckets) + [0.0, 0]
+            for index, bound in enumerate(self.buckets):
+                if value <= bound:
+                    series[index] += 1
+                    break
+            series[-2] += value
+            series[-1] += 1
+
+    def samples(self):
+        with self._lock:
+            values = {key: list(series) for key, series in self._values.items()}
+        for key, series in sorted(values.items()):
+            cumulative = 0
+            for bound, count in zip(self.buckets, series):
+                cumulative += count
+                labels = _format_labels(self.labels, key, [("le", bound)])
+                yield f"{self.name}_bucket", labels, cumulative
+            labels = _format_labels(self.labels, key, [("le", "+Inf")])
+            yield f"{self.name}_bucket", labels, series[-1]
+            yield f"{self.name}_sum", _format_labels(self.labels, key), series[-2]
+            yield f"{self.name}_count", _format_labels(self.labels, key), series[-1]
+
+
+class Collected:
+    """A gauge or counter whose values are read from ``collect()`` at scrape time."""
+
+    def __init__(self, name, help, labels, collect, kind="gauge"):
+        self.name = name
+        self.help = help
+        self.labels = tuple(labels)
+        self.kind = kind
+        self._collect = collect
+        _registry.append(self)
+
+    def samples(self):
+        for key, value in sorted(self._collect().items()):
+            yield self.name, _format_labels(self.labels, key), value
+
+
+def render():
+    """Every registered metric in the Prometheus text exposition format."""
+    lines = []
+    for metric in _registry:
+        lines.append(f"# HELP {metric.name} {metric.help}")
+        lines.append(f"# TYPE {metric.name} {metric.kind}")
+        for name, labels, value in metric.samples():
+            lines.append(f"{name}{labels} {_format_value(value)}")
+    return "\n".join(lines) + "\n"
+
+
+request_duration = Histogram(
+    "http_request_duration_seconds",
+    "Time to produce a response, by route",
+    ("route", "method", "status"),
+)
+request_db_time = Histogram(
+    "http_request_db_seconds",
+    "Database time (execute and fetch) spent within one request",
+    ("route",),
+)
+template_duration = Histogram(
+    "template_render_seconds",
+    "Jinja template render time",
+    ("template",),
+    buckets=FAST_BUCKETS,
+)
+query_duration = Histogram(
+    "db_query_duration_seconds",
+    "cursor.execute/executemany time",
+    ("route", "operation"),
+)
+fetch_duration = Histogram(
+    "db_fetch_duration_seconds",
+    "Time spent fetching result rows, per fetch call",
+    ("route", "operation"),
+    buckets=FAST_BUCKETS,
+)
+rows_fetched = Counter(
+    "db_rows_fetched_total", "Rows fetched from result sets", ("route", "operation")
+)
+rows_affected = Counter(
+    "db_rows_affected_total", "Rows reported changed by writes", ("route", "operation")
+)
+slow_queries = Counter(
+    "db_slow_queries_total",
+    f"Queries slower than SLOW_QUERY_SECONDS ({SLOW_QUERY_SECONDS}s)",
+    ("route", "operation"),
+)
+pool_wait = Histogram(
+    "db_pool_wait_seconds",
+    "Time a checkout waited for a pooled connection slot",
+    buckets=FAST_BUCKETS,
+)
+pool_connect = Histogram("db_connect_seconds", "Time to open a new database connection")
+pool_timeouts = Counter(
+    "db_pool_timeouts_total", "Checkouts that gave up waiting for a connection"
+)
+password_hash_duration = Histogram(
+    "password_hash_seconds",
+    "Time spent hashing or checking a password on the hashing pool",
+    ("operation",),
+)
+password_hash_rejected = Counter(
+    "password_hash_rejected_total",
+    "Hashing requests turned away because the hashing pool was full",
+    ("operation",),
+)
+
+
+def _route():
+    if not has_request_context():
+        return "-"
+    rule = request.url_rule
+    return rule.rule if rule is not None else "unmatched"
+
+
+def _operation(sql):
+    words = sql.lstrip().split(None, 1)
+    verb = words[0].upper() if words else ""
+    return verb if verb in SQL_OPERATIONS else "OTHER"
+
+
+def _add_db_time(seconds):
+    if has_request_context():
+        g.db_seconds = g.get("db_seconds", 0.0) + seconds
+        g.db_calls = g.get("db_calls", 0) + 1
+
+
+class InstrumentedCursor:
+    """
+    Timing proxy around a pyodbc cursor. Attribute reads and writes (e.g.
+    ``fast_executemany``, ``description``) pass through to the real cursor.
+    """
+
+    def __init__(self, cursor):
+        object.__setattr__(self, "_cursor", cursor)
+        object.__setattr__(self, "_labels", {"route": "-", "operation": "OTHER"})
+
+    def __getattr__(self, name):
+        return getattr(self._cursor, name)
+
+    def __setattr__(self, name, value):
+        setattr(self._cursor, name, value)
+
+    def _timed_execute(self, method, sql, args):
+        labels = {"route": _route(), "operation": _operation(sql)}
+        object.__setattr__(self, "_labels", labels)
+
+        started = time.perf_counter()
+        try:
+            return method(sql, *args)
+        finally:
+            elapsed = time.perf_counter() - started
+            query_duration.observe(elapsed, **labels)
+            _add_db_time(elapsed)
+            if elapsed >= SLOW_QUERY_SECONDS:
+                slow_queries.inc(**labels)
+                log.warning(
+                    "Slow query",
+                    extra={
+                        "duration_ms": round(elapsed * 1000, 1),
+                        "sql": " ".join(sql.split())[:1000],
+                        **labels,
+                    },
+                )
+
+    def execute(self, sql, *params):
+        self._timed_execute(self._cursor.execute, sql, params)
+        if self._labels["operation"] not in ("SELECT", "WITH", "OTHER"):
+            self._count_affected()
+        return self
+
+    def executemany(self, sql, seq_of_params):
+        result = self._timed_execute(self._cursor.executemany, sql, (seq_of_params,))
+        self._count_affected()
+        return result
+
+    def _count_affected(self):
+        rowcount = self._cursor.rowcount
+        if rowcount is not None and rowcount > 0:
+            rows_affected.inc(rowcount, **self._labels)
+
+    def _timed_fetch(self, method, *args):
+        started = time.perf_counter()
+        result = method(*args)
+        elapsed = time.perf_counter() - started
+        fetch_duration.observe(elapsed, **self._labels)
+        _add_db_time(elapsed)
+        return result
+
+    def fetchone(self):
+        row = self._timed_fetch(self._cursor.fetchone)
+        if row is not None:
+            rows_fetched.inc(**self._labels)
+        return row
+
+    def fetchval(self):
+        value = self._timed_fetch(self._cursor.fetchval)
+        rows_fetched.inc(**self._labels)
+        return value
+
+    def fetchmany(self, size=None):
+        args = () if size is None else (size,)
+        rows = self._timed_fetch(self._cursor.fetchmany, *args)
+        rows_fetched.inc(len(rows), **self._labels)
+        return rows
+
+    def fetchall(self):
+        rows = self._timed_fetch(self._cursor.fetchall)
+        rows_fetched.inc(len(rows), **self._labels)
+        return rows
+
+    def __iter__(self):
+        while True:
+            rows = self.fetchmany(256)
+            if not rows:
+                return
+            yield from rows
+
+    def __enter__(self):
+        self._cursor.__enter__()
+        return self
+
+    def __exit__(self, *exc_info):
+        return self._cursor.__exit__(*exc_info)
+
+
+def observe_checkout(wait_seconds, connect_seconds):
+    """``ConnectionPool(on_checkout=...)`` hook."""
+    pool_wait.observe(wait_seconds)
+    if connect_seconds is not None:
+        pool_connect.observe(connect_seconds)
+    _add_db_time(wait_seconds + (connect_seconds or 0.0))
+
+
+_caches = {}  # name -> TTLCache, see track_cache()
+
+
+def _cache_stat(key):
+    return lambda: {(name,): cache.stats()[key] for name, cache in _caches.items()}
+
+
+def track_cache(name, cache):
+    """Export a ``TTLCache``'s hit/miss counters, hit ratio and size."""
+    if not _caches:
+        # One metric family per stat, labelled by cache, however many are tracked
+        Collected(
+            "cache_hits_total", "Cache hits", ("cache",), _cache_stat("hits"), "counter"
+        )
+        Collected(
+            "cache_misses_total",
+            "Cache misses",
+            ("cache",),
+            _cache_stat("misses"),
+            "counter",
+        )
+        Collected(
+            "cache_hit_ratio", "Hits / lookups", ("cache",), _cache_stat("hit_ratio")
+        )
+        Collected(
+            "cache_evictions_total",
+            "Entries evicted for space",
+            ("cache",),
+            _cache_stat("evictions"),
+            "counter",
+        )
+        Collected("cache_entries", "Entries held", ("cache",), _cache_stat("entries"))
+        Collected(
+            "cache_bytes", "Approximate bytes held", ("cache",), _cache_stat("bytes")
+        )
+    _caches[name] = cache
+
+
+_pools = {}  # name -> ConnectionPool, see track_pool()
+
+
+def track_pool(pool, name="primary"):
+    """Export a ``ConnectionPool``'s open/idle/in-use connection counts."""
+    if not _pools:
+        Collected(
+            "db_pool_connections",
+            "Pooled connections by state",
+            ("pool", "state"),
+            lambda: {
+                (pool_name, state): count
+                for pool_name, tracked in _pools.items()
+                for state, count in tracked.status().items()
+            },
+        )
+    _pools[name] = pool
+
+
+def instrument_app(app):
+    @app.before_request
+    def start_timer():
+        g.request_started = time.perf_counter()
+        g.db_seconds = 0.0
+        g.db_calls = 0
+
+    @app.after_request
+    def record_request(response):
+        started = g.get("request_started")
+        if started is None:
+            return response
+        elapsed = time.perf_counter() - started
+        route = _route()
+        request_duration.observe(
+            elapsed,
+            route=route,
+            method=request.method,
+            status=str(response.status_code),
+        )
+        request_db_time.observe(g.db_seconds, route=route)
+        response.headers.add(
+            "Server-Timing",
+            f'db;dur={g.db_seconds * 1000:.1f};desc="{g.db_calls} calls", '
+            f"total;dur={elapsed * 1000:.1f}",
+        )
+        return response
+
+    def template_started(sender, template, context, **extra):
+        g.setdefault("template_started", {})[template.name] = time.perf_counter()
+
+    def template_finished(sender, template, context, **extra):
+        started = g.get("template_started", {}).pop(template.name, None)
+        if started is not None:
+            template_duration.observe(
+                time.perf_counter() - started, template=template.name or "-"
+            )
+
+    before_render_template.connect(template_started, app, weak=False)
+    template_rendered.connect(template_finished, app, weak=False)
@@ -0,0 +1,269 @@
+"""
+Ordered, idempotent schema migrations for the raw-SQL tables.
+
+Each migration is a name plus a list of T-SQL batches (CREATE VIEW has to be
+the first statement of its batch, so batches are executed one by one). Applied
+names are recorded in dbo.SchemaMigrations; run ``flask --app login migrate-db``
+to apply whatever is pending.
+
+Migrations spell out all of their SQL: an applied migration must not change
+when a module it would otherwise import (e.g. sdgs.BACKFILL_SQL) does.
+"""
+
+MIGRATIONS = [
+    (
+        "0001_dashboard_summary",
+        [
+            """
+            CREATE TABLE dbo.DashboardSummary (
+                bucket VARCHAR(20) NOT NULL,
+                bucket_key NVARCHAR(255) NOT NULL,
+                status NVARCHAR(50) NOT NULL,
+                total INT NOT NULL,
+                CONSTRAINT PK_DashboardSummary PRIMARY KEY (bucket, bucket_key, status)
+            )
+            """,
+            # One row per (project, bucket, key) a project contributes to the
+            # dashboard: its status, each SDG it is tagged with, its campus and
+            # its year. Both the rebuild and the incremental updates read this.
+            """
+            CREATE VIEW dbo.ProjectSummaryContrib AS
+            SELECT p.projectid, 'status' AS bucket,
+                CAST(p.projectstatus AS NVARCHAR(255)) AS bucket_key, p.projectstatus AS status
+            FROM dbo.Projects AS p
+            WHERE p.sdg IS NOT NULL AND p.projectstatus IN ('Completed', 'In Progress')
+            UNION ALL
+            SELECT p.projectid, 'sdg',
+                CAST(TRY_CAST(LTRIM(RTRIM(s.value)) AS INT) AS NVARCHAR(255)), p.projectstatus
+            FROM dbo.Projects AS p
+            CROSS APPLY STRING_SPLIT(p.sdg, ',') AS s
+            WHERE p.sdg IS NOT NULL AND p.projectstatus IN ('Completed', 'In Progress')
+                AND TRY_CAST(LTRIM(RTRIM(s.value)) AS INT) BETWEEN 1 AND 17
+            UNION ALL
+            SELECT p.projectid, 'campus',
+                CAST(LTRIM(RTRIM(p.collegecampus)) AS NVARCHAR(255)), p.projectstatus
+            FROM dbo.Projects AS p
+            WHERE p.sdg IS NOT NULL AND p.projectstatus IN ('Completed', 'In Progress')
+                AND NULLIF(LTRIM(RTRIM(p.collegecampus)), '') IS NOT NULL
+            UNION ALL
+            SELECT p.projectid, 'year',
+                CAST(YEAR(TRY_CONVERT(DATE, p.projectdate)) AS NVARCHAR(255)), p.projectstatus
+            FROM dbo.Projects AS p
+            WHERE p.sdg IS NOT NULL AND p.projectstatus IN ('Completed', 'In Progress')
+                AND TRY_CONVERT(DATE, p.projectdate) IS NOT NULL
+            """,
+            """
+            INSERT INTO dbo.DashboardSummary (bucket, bucket_key, status, total)
+            SELECT bucket, bucket_key, status, COUNT(*)
+            FROM dbo.ProjectSummaryContrib
+            GROUP BY bucket, bucket_key, status
+            """,
+        ],
+    ),
+    (
+        "0002_table_versions",
+        [
+            """
+            CREATE TABLE dbo.TableVersions (
+                table_name VARCHAR(100) NOT NULL PRIMARY KEY,
+                version BIGINT NOT NULL DEFAULT 1,
+                updated_at DATETIME2 NOT NULL DEFAULT SYSUTCDATETIME()
+            )
+            """,
+            "INSERT INTO dbo.TableVersions (table_name) VALUES ('Projects')",
+        ],
+    ),
+    (
+        "0003_projects_location_index",
+        [
+            """
+            CREATE INDEX IX_Projects_y_x ON dbo.Projects (y, x)
+            INCLUDE (title)
+            WHERE x IS NOT NULL AND y IS NOT NULL
+            """,
+        ],
+    ),
+    (
+        "0004_project_sdg",
+        [
+            """
+            CREATE TABLE dbo.ProjectSDG (
+                projectid INT NOT NULL,
+                sdg TINYINT NOT NULL,
+                CONSTRAINT PK_ProjectSDG PRIMARY KEY (projectid, sdg)
+            )
+            """,
+            "CREATE INDEX IX_ProjectSDG_sdg ON dbo.ProjectSDG (sdg, projectid)",
+            # Rebuild dbo.ProjectSDG from the legacy comma-separated column
+            """
+            INSERT INTO dbo.ProjectSDG (projectid, sdg)
+            SELECT DISTINCT p.projectid, TRY_CAST(LTRIM(RTRIM(s.value)) AS INT)
+            FROM dbo.Projects AS p
+            CROSS APPLY STRING_SPLIT(p.sdg, ',') AS s
+            WHERE TRY_CAST(LTRIM(RTRIM(s.value)) AS INT) BETWEEN 1 AND 17
+            """,
+            # Per-SDG dashboard counts now come from the join table
+            """
+            CREATE OR ALTER VIEW dbo.ProjectSummaryContrib AS
+            SELECT p.projectid, 'status' AS bucket,
+                CAST(p.projectstatus AS NVARCHAR(255)) AS bucket_key, p.projectstatus AS status
+            FROM dbo.Projects AS p
+            WHERE p.sdg IS NOT NULL AND p.projectstatus IN ('Completed', 'In Progress')
+            UNION ALL
+            SELECT p.projectid, 'sdg', CAST(ps.sdg AS NVARCHAR(255)), p.projectstatus
+            FROM dbo.Projects AS p
+            JOIN dbo.ProjectSDG AS ps ON ps.projectid = p.projectid
+            WHERE p.sdg IS NOT NULL AND p.projectstatus IN ('Completed', 'In Progress')
+            UNION ALL
+            SELECT p.projectid, 'campus',
+                CAST(LTRIM(RTRIM(p.collegecampus)) AS NVARCHAR(255)), p.projectstatus
+            FROM dbo.Projects AS p
+            WHERE p.sdg IS NOT NULL AND p.projectstatus IN ('Completed', 'In Progress')
+                AND NULLIF(LTRIM(RTRIM(p.collegecampus)), '') IS NOT NULL
+            UNION ALL
+            SELECT p.projectid, 'year',
+                CAST(YEAR(TRY_CONVERT(DATE, p.projectdate)) AS NVARCHAR(255)), p.projectstatus
+            FROM dbo.Projects AS p
+            WHERE p.sdg IS NOT NULL AND p.projectstatus IN ('Completed', 'In Progress')
+                AND TRY_CONVERT(DATE, p.projectdate) IS NOT NULL
+            """,
+            "DELETE FROM dbo.DashboardSummary",
+            """
+            INSERT INTO dbo.DashboardSummary (bucket, bucket_key, status, total)
+            SELECT bucket, bucket_key, status, COUNT(*)
+            FROM dbo.ProjectSummaryContrib
+            GROUP BY bucket, bucket_key, status
+            """,
+        ],
+    ),
+    (
+        # Run "flask backfill-dates" afterwards to parse the legacy formats
+        # TRY_CONVERT misses and to get a report of what could not be parsed.
+        "0005_typed_projectdate",
+        [
+            """
+            ALTER TABLE dbo.Projects ADD
+                projectdate_value DATE NULL,
+                projectyear AS YEAR(projectdate_value) PERSISTED
+            """,
+            "CREATE INDEX IX_Projects_projectyear ON dbo.Projects (projectyear)",
+            """
+            UPDATE dbo.Projects
+            SET projectdate_value = TRY_CONVERT(DATE, projectdate)
+            WHERE projectdate IS NOT NULL
+            """,
+            """
+            CREATE OR ALTER VIEW dbo.ProjectSummaryContrib AS
+            SELECT p.projectid, 'status' AS bucket,
+                CAST(p.projectstatus AS NVARCHAR(255)) AS bucket_key, p.projectstatus AS status
+            FROM dbo.Projects AS p
+            WHERE p.sdg IS NOT NULL AND p.projectstatus IN ('Completed', 'In Progress')
+            UNION ALL
+            SELECT p.projectid, 'sdg', CAST(ps.sdg AS NVARCHAR(255)), p.projectstatus
+            FROM dbo.Projects AS p
+            JOIN dbo.ProjectSDG AS ps ON ps.projectid = p.projectid
+            WHERE p.sdg IS NOT NULL AND p.projectstatus IN ('Completed', 'In Progress')
+            UNION ALL
+            SELECT p.projectid, 'campus',
+                CAST(LTRIM(RTRIM(p.collegecampus)) AS NVARCHAR(255)), p.projectstatus
+            FROM dbo.Projects AS p
+            WHERE p.sdg IS NOT NULL AND p.projectstatus IN ('Completed', 'In Progress')
+                AND NULLIF(LTRIM(RTRIM(p.collegecampus)), '') IS NOT NULL
+            UNION ALL
+            SELECT p.projectid, 'year', CAST(p.projectyear AS NVARCHAR(255)), p.projectstatus
+            FROM dbo.Projects AS p
+            WHERE p.sdg IS NOT NULL AND p.projectstatus IN ('Completed', 'In Progress')
+                AND p.projectyear IS NOT NULL
+            """,
+            "DELETE FROM dbo.DashboardSummary",
+            """
+            INSERT INTO dbo.DashboardSummary (bucket, bucket_key, status, total)
+            SELECT bucket, bucket_key, status, COUNT(*)
+            FROM dbo.ProjectSummaryContrib
+            GROUP BY bucket, bucket_key, status
+            """,
+        ],
+    ),
+    (
+        # New project IDs come from a sequence instead of MAX(projectid) + 1,
+        # so concurrent inserts can never pick the same ID
+        "0006_project_id_sequence",
+        [
+            """
+            DECLARE @start BIGINT = (SELECT ISNULL(MAX(projectid), 0) + 1 FROM dbo.Projects);
+            EXEC('CREATE SEQUENCE dbo.ProjectIdSeq AS INT START WITH '
+                + CAST(@start AS VARCHAR(20)) + ' INCREMENT BY 1 CACHE 50');
+            """,
+            """
+            ALTER TABLE dbo.Projects ADD CONSTRAINT DF_Projects_projectid
+                DEFAULT (NEXT VALUE FOR dbo.ProjectIdSeq) FOR projectid
+            """,
+        ],
+    ),
+    (
+        # Keyset pagination in listing.py seeks on (sort column, projectid)
+        "0007_listing_sort_indexes",
+        [
+            "CREATE INDEX IX_Projects_title ON dbo.Projects (title, projectid)",
+            "CREATE INDEX IX_Projects_leader ON dbo.Projects (leader, projectid)",
+            """
+            CREATE INDEX IX_Projects_projectstatus
+                ON dbo.Projects (projectstatus, projectid)
+            """,
+            """
+            CREATE INDEX IX_Projects_collegecampus
+                ON dbo.Projects (collegecampus, projectid)
+            """,
+        ],
+    ),
+    (
+        # The listing's date sort uses the typed column from 0005
+        "0008_projectdate_sort_index",
+        [
+            """
+            CREATE INDEX IX_Projects_projectdate_value
+                ON dbo.Projects (projectdate_value, projectid)
+            """,
+        ],
+    ),
+]
+
+
+def _ensure_migrations_table(cursor):
+    cursor.execute("""
+        IF OBJECT_ID('dbo.SchemaMigrations', 'U') IS NULL
+            CREATE TABLE dbo.SchemaMigrations (
+                name VARCHAR(100) NOT NULL PRIMARY KEY,
+                applied_at DATETIME2 NOT NULL DEFAULT SYSUTCDATETIME()
+            )
+    """)
+
+
+def applied_migrations(cursor):
+    _ensure_migrations_table(cursor)
+    cursor.execute("SELECT name FROM dbo.SchemaMigrations")
+    return {row[0] for row in cursor.fetchall()}
+
+
+def migrate(conn):
+    """Apply every pending migration, each in its own transaction. Returns their names."""
+    cursor = conn.cursor()
+    done = applied_migrations(cursor)
+    conn.commit()
+
+    applied = []
+    for name, batches in MIGRATIONS:
+        if name in done:
+            continue
+        try:
+            for batch in batches:
+                cursor.execute(batch)
+            cursor.execute("INSERT INTO dbo.SchemaMigrations (name) VALUES (?)", name)
+            conn.commit()
+        except Exception:
+            conn.rollback()
+            raise
+        applied.append(name)
+
+    cursor.close()
+    return applied
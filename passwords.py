@@ -0,0 +1,96 @@
+"""
+Password hashing on a small, bounded thread pool.
+
+Hashes are deliberately slow, so a burst of logins at the start of a semester
+could otherwise occupy every request thread (and core) while the dashboards
+wait. Here at most PASSWORD_HASH_WORKERS hashes run at once, at most
+PASSWORD_HASH_QUEUE more wait for a worker, and anything beyond that fails
+fast with ``HashingBusy`` so the caller can answer 503 instead of piling up.
+(hashlib releases the GIL while hashing, so the workers run in parallel.)
+
+The cost is set with PASSWORD_HASH_METHOD (any werkzeug method string, e.g.
+"scrypt:32768:8:1" or "pbkdf2:sha256:600000"). Hashes made with a different
+method still verify, and ``needs_rehash`` tells the login view to upgrade them.
+"""
+
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from werkzeug.security import (
+    DEFAULT_PBKDF2_ITERATIONS,
+    check_password_hash,
+    generate_password_hash,
+)
+
+import metrics
+
+PASSWORD_HASH_METHOD = os.environ.get("PASSWORD_HASH_METHOD", "scrypt:32768:8:1")
+PASSWORD_HASH_WORKERS = int(os.environ.get("PASSWORD_HASH_WORKERS", 2))
+PASSWORD_HASH_QUEUE = int(os.environ.get("PASSWORD_HASH_QUEUE", 16))
+# Seconds to wait for a free slot before giving up
+PASSWORD_HASH_TIMEOUT = float(os.environ.get("PASSWORD_HASH_TIMEOUT", 5))
+
+_executor = ThreadPoolExecutor(
+    max_workers=PASSWORD_HASH_WORKERS, thread_name_prefix="password-hash"
+)
+_slots = threading.BoundedSemaphore(PASSWORD_HASH_WORKERS + PASSWORD_HASH_QUEUE)
+
+
+class HashingBusy(Exception):
+    """Raised when every hashing slot stayed taken for PASSWORD_HASH_TIMEOUT."""
+
+
+def _run(operation, function, *args):
+    if not _slots.acquire(timeout=PASSWORD_HASH_TIMEOUT):
+        metrics.password_hash_rejected.inc(operation=operation)
+        raise HashingBusy(f"No free password hashing slot for {operation}")
+
+    def timed():
+        start = time.perf_counter()
+        try:
+            return function(*args)
+        finally:
+            elapsed = time.perf_counter() - start
+            metrics.password_hash_duration.observe(elapsed, operation=operation)
+
+    try:
+        future = _executor.submit(timed)
+    except BaseException:
+        _slots.release()
+        raise
+    future.add_done_callback(lambda _: _slots.release())
+    return future.result()
+
+
+def hash_password(password):
+    return _run("hash", generate_password_hash, password, PASSWORD_HASH_METHOD)
+
+
+def check_password(stored_hash, password):
+    return _run("check", check_password_hash, stored_hash, password)
+
+
+def method_prefix(method):
+    """
+    The prefix werkzeug writes for ``method``, with its defaults filled in the
+    same way (e.g. "scrypt" -> "scrypt:32768:8:1"), without hashing anything.
+    """
+    name, *args = method.split(":")
+    if name == "scrypt":
+        n, r, p = args or (2**15, 8, 1)
+        return f"scrypt:{int(n)}:{int(r)}:{int(p)}"
+    if name == "pbkdf2" and len(args) <= 2:
+        hash_name = args[0] if args else "sha256"
+        iterations = int(args[1]) if len(args) == 2 else DEFAULT_PBKDF2_ITERATIONS
+        return f"pbkdf2:{hash_name}:{iterations}"
+    raise ValueError(f"Invalid hash method {method!r}")
+
+
+_current_prefix = method_prefix(PASSWORD_HASH_METHOD)
+
+
+def needs_rehash(stored_hash):
+    """True if ``stored_hash`` was made with a method other than the current one."""
+    return stored_hash.split("$", 1)[0] != _current_prefix
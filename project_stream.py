@@ -0,0 +1,115 @@
+"""
+Incremental JSON for the geolocated projects behind /api/projects.
+
+Rows are read in batches with keyset pagination on ``projectid`` and written
+out one at a time, so a worker never holds the whole table as Python dicts.
+The compact format returns parallel ``ids``/``lat``/``lng``/``title`` arrays
+for the map markers instead of full row objects.
+"""
+
+import json
+
+from serializers import location_serializer
+
+DEFAULT_PAGE_SIZE = 1000
+MAX_PAGE_SIZE = 5000
+FETCH_BATCH = 500
+
+
+def _dumps(value):
+    return json.dumps(value, default=str, ensure_ascii=False, separators=(",", ":"))
+
+
+def _select_locations(cursor, select_list, after, limit):
+    where = "x IS NOT NULL AND y IS NOT NULL"
+    params = []
+    if after is not None:
+        where += " AND projectid > ?"
+        params.append(after)
+
+    top = ""
+    if limit is not None:
+        top = "TOP (?) "
+        params.insert(0, limit)
+
+    cursor.execute(
+        f"SELECT {top}{select_list} FROM dbo.Projects WHERE {where} ORDER BY projectid",
+        params,
+    )
+
+
+def _fetch_batches(cursor):
+    while True:
+        rows = cursor.fetchmany(FETCH_BATCH)
+        if not rows:
+            return
+        yield rows
+
+
+def stream_locations(conn, after=None, limit=None, paged=False):
+    """
+    Run the location query on ``conn`` and return a generator of JSON chunks.
+
+    Without ``paged`` the output is a bare array (the original /api/projects
+    shape); with it the array is wrapped as ``{"projects": [...], "next_after": id}``.
+    The query runs before this returns, so database errors surface before any
+    bytes are sent; the caller releases ``conn`` once the response is done.
+    """
+    cursor = conn.cursor()
+    _select_locations(cursor, "*", after, limit)
+    columns = [column[0] for column in cursor.description]
+    id_index = columns.index("projectid")
+    serialize = location_serializer(columns)
+
+    def write():
+        last_id = None
+        count = 0
+
+        yield b'{"projects":[' if paged else b"["
+
+        for rows in _fetch_batches(cursor):
+            chunk = [_dumps(serialize(row)) for row in rows]
+            last_id = rows[-1][id_index]
+            prefix = "," if count else ""
+            count += len(rows)
+            yield (prefix + ",".join(chunk)).encode("utf-8")
+
+        cursor.close()
+
+        if paged:
+            next_after = last_id if limit is not None and count == limit else None
+            yield b'],"next_after":' + _dumps(next_after).encode("utf-8") + b"}"
+        else:
+            yield b"]"
+
+    return write()
+
+
+def _coordinate(value):
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        return None
+
+
+def compact_locations(conn, after=None, limit=DEFAULT_PAGE_SIZE):
+    """Return one page of markers as parallel arrays plus the next cursor."""
+    cursor = conn.cursor()
+    _select_locations(cursor, "projectid, y, x, title", after, limit)
+
+    page = {"ids": [], "lat": [], "lng": [], "title": []}
+    for rows in _fetch_batches(cursor):
+        for projectid, lat, lng, title in rows:
+            page["ids"].append(projectid)
+            page["lat"].append(_coordinate(lat))
+            page["lng"].append(_coordinate(lng))
+            page["title"].append(title or "")
+    cursor.close()
+
+    full_page = limit is not None and len(page["ids"]) == limit
+    page["next_after"] = page["ids"][-1] if full_page else None
+    return page
+
+
+def compact_json(page):
+    return _dumps(page).encode("utf-8")
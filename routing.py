@@ -0,0 +1,122 @@
+"""
+Routing of read-only queries to a read replica.
+
+Only callers that ask for a read-only connection are candidates, and they get
+the replica only while it is fresh enough:
+
+- every REPLICA_CHECK_INTERVAL seconds the dbo.TableVersions rows of primary
+  and replica are compared; the replica counts as stale once it has been
+  behind for more than REPLICA_MAX_LAG seconds, or when it can't be reached
+- a session that has just written sticks to the primary for
+  REPLICA_MAX_LAG + REPLICA_CHECK_INTERVAL seconds, the longest a fresh replica
+  can take to show that write (read-your-writes)
+
+The decision is made once per request, so the ETag and the data of one
+response always come from the same database. Writes, auth and CLI commands
+keep using the primary.
+"""
+
+import logging
+import threading
+import time
+
+from flask import g, has_request_context, session
+
+import versions
+
+log = logging.getLogger("evsu")
+
+# Session key: epoch seconds until which this session reads from the primary
+STICKY_KEY = "read_primary_until"
+
+
+class ReplicaRouter:
+    def __init__(self, primary, replica, max_lag=5.0, check_interval=1.0):
+        self.primary = primary
+        self.replica = replica
+        self.max_lag = max_lag
+        self.check_interval = check_interval
+        self.sticky_seconds = max_lag + check_interval
+
+        self._lock = threading.Lock()
+        self._checked_at = float("-inf")
+        self._behind_since = None
+        self._fresh = False
+
+    def pool_for_read(self):
+        """The pool a read-only query in the current request should use."""
+        if not has_request_context():
+            return self.primary
+
+        use_replica = g.get("use_replica")
+        if use_replica is None:
+            sticky = session.get(STICKY_KEY, 0) > time.time()
+            use_replica = g.use_replica = not sticky and self.replica_is_fresh()
+        return self.replica if use_replica else self.primary
+
+    def mark_written(self):
+        """Pin the current session to the primary until the replica catches up."""
+        if has_request_context():
+            session[STICKY_KEY] = time.time() + self.sticky_seconds
+            g.use_replica = False
+
+    def replica_is_fresh(self):
+        now = time.monotonic()
+        if now - self._checked_at < self.check_interval:
+            return self._fresh
+        # One thread re-checks; the others go on with the previous answer
+        if not self._lock.acquire(blocking=False):
+            return self._fresh
+        try:
+            self._fresh = self._check(now)
+            self._checked_at = now
+        finally:
+            self._lock.release()
+        return self._fresh
+
+    def status(self):
+        return {
+            "fresh": self._fresh,
+            "behind_for": (
+                round(time.monotonic() - self._behind_since, 3)
+                if self._behind_since is not None
+                else 0.0
+            ),
+            "max_lag": self.max_lag,
+        }
+
+    def _check(self, now):
+        try:
+            primary_versions = _read_versions(self.primary)
+            replica_versions = _read_versions(self.replica)
+        except Exception as e:
+            log.warning(
+                "Replica check failed; reading from the primary",
+                extra={"error": str(e)},
+            )
+            return False
+
+        behind = any(
+            replica_versions.get(table, 0) < version
+            for table, version in primary_versions.items()
+        )
+        if not behind:
+            self._behind_since = None
+            return True
+        if self._behind_since is None:
+            self._behind_since = now
+        fresh = now - self._behind_since <= self.max_lag
+        if not fresh and self._fresh:
+            log.warning(
+                "Replica is behind; reading from the primary",
+                extra={"behind_for": round(now - self._behind_since, 3)},
+            )
+        return fresh
+
+
+def _read_versions(pool):
+    with pool.connect() as conn:
+        cursor = conn.cursor()
+        table_versions = versions.all_current(cursor)
+        cursor.close()
+    return table_versions
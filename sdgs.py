@@ -0,0 +1,95 @@
+"""
+Normalized SDG tags in dbo.ProjectSDG (one row per project and goal).
+
+dbo.Projects.sdg is still written as a comma-separated copy for older readers,
+but lookups and counts go through the indexed join table.
+"""
+
+import versions
+
+SDG_NUMBERS = range(1, 18)
+
+# Rebuilds dbo.ProjectSDG from the legacy comma-separated column
+BACKFILL_SQL = """
+INSERT INTO dbo.ProjectSDG (projectid, sdg)
+SELECT DISTINCT p.projectid, TRY_CAST(LTRIM(RTRIM(s.value)) AS INT)
+FROM dbo.Projects AS p
+CROSS APPLY STRING_SPLIT(p.sdg, ',') AS s
+WHERE TRY_CAST(LTRIM(RTRIM(s.value)) AS INT) BETWEEN 1 AND 17
+"""
+
+# Project rows with their SDGs aggregated from the join table as "sdg_list"
+_WITH_SDGS = """
+SELECT p.*, (
+    SELECT STRING_AGG(CAST(ps.sdg AS VARCHAR(3)), ',') WITHIN GROUP (ORDER BY ps.sdg)
+    FROM dbo.ProjectSDG AS ps
+    WHERE ps.projectid = p.projectid
+) AS sdg_list
+FROM dbo.Projects AS p
+WHERE {where}
+"""
+
+PROJECT_WITH_SDGS = _WITH_SDGS.format(where="p.projectid = ?")
+
+# Most IDs fetched in one IN (...) query (SQL Server allows 2100 parameters)
+MAX_BATCH_IDS = 500
+
+
+def projects_with_sdgs(count):
+    """Like PROJECT_WITH_SDGS for ``count`` IDs, in one ``IN (...)`` query."""
+    placeholders = ", ".join("?" for _ in range(count))
+    return _WITH_SDGS.format(where=f"p.projectid IN ({placeholders})")
+
+
+def parse(values):
+    """Sorted, de-duplicated SDG numbers from form values or a CSV string."""
+    if isinstance(values, str):
+        values = values.split(",")
+
+    numbers = set()
+    for value in values:
+        for part in str(value).split(","):
+            part = part.strip()
+            if not part:
+                continue
+            try:
+                number = int(part)
+            except ValueError:
+                continue
+            if number in SDG_NUMBERS:
+                numbers.add(number)
+    return sorted(numbers)
+
+
+def to_csv(numbers):
+    return ",".join(str(number) for number in numbers)
+
+
+def replace_project_sdgs(cursor, projectid, numbers):
+    cursor.execute("DELETE FROM dbo.ProjectSDG WHERE projectid = ?", projectid)
+    if numbers:
+        cursor.executemany(
+            "INSERT INTO dbo.ProjectSDG (projectid, sdg) VALUES (?, ?)",
+            [(projectid, number) for number in numbers],
+        )
+
+
+def delete_project_sdgs(cursor, projectid):
+    cursor.execute("DELETE FROM dbo.ProjectSDG WHERE projectid = ?", projectid)
+
+
+def backfill(conn):
+    """Re-derive every dbo.ProjectSDG row from dbo.Projects.sdg. Returns the row count."""
+    cursor = conn.cursor()
+    try:
+        cursor.execute("DELETE FROM dbo.ProjectSDG")
+        cursor.execute(BACKFILL_SQL)
+        rows = cursor.rowcount
+        versions.bump(cursor, "Projects")
+        conn.commit()
+    except Exception:
+        conn.rollback()
+        raise
+    finally:
+        cursor.close()
+    return rows
@@ -0,0 +1,140 @@
+"""
+In-process full-text index over the projects for the map search box.
+
+Every word of title, leader, projectlocation, collegecampus and members is put
+in an inverted index (term -> {projectid: weight}). The vocabulary is kept
+sorted so a query word also matches every term it is a prefix of, which is
+what typeahead needs. All query words must match; results are ranked by the
+summed field weights, with exact word matches worth more than prefix matches.
+
+The index is rebuilt lazily when dbo.TableVersions shows that dbo.Projects
+changed, so every worker picks up writes made through any other worker.
+"""
+
+import bisect
+import heapq
+import re
+import threading
+from collections import defaultdict
+
+FIELD_WEIGHTS = {
+    "title": 3.0,
+    "leader": 2.0,
+    "projectlocation": 1.5,
+    "collegecampus": 1.0,
+    "members": 1.0,
+}
+PREFIX_FACTOR = 0.5
+MAX_PREFIX_TERMS = 200
+
+DEFAULT_LIMIT = 10
+MAX_LIMIT = 50
+
+INDEX_QUERY = f"""
+SELECT projectid, y, x, {", ".join(FIELD_WEIGHTS)}
+FROM dbo.Projects
+"""
+
+_WORD = re.compile(r"\w+", re.UNICODE)
+
+
+def tokenize(text):
+    return _WORD.findall(text.lower()) if text else []
+
+
+def _is_current(built, wanted):
+    # Versions only go up; an older one (e.g. read from a lagging replica) is
+    # already covered by the index
+    return built is not None and wanted is not None and built >= wanted
+
+
+class SearchIndex:
+    def __init__(self):
+        self.version = None
+        self._postings = {}
+        self._terms = []
+        self._docs = {}
+        self._lock = threading.Lock()
+        # Held for a whole load + build, so one request rebuilds and the rest wait
+        self._build_lock = threading.Lock()
+
+    def build(self, rows, version=None):
+        """Index ``rows`` of (projectid, lat, lng, *FIELD_WEIGHTS columns)."""
+        postings = defaultdict(dict)
+        docs = {}
+
+        for row in rows:
+            projectid, lat, lng = row[0], row[1], row[2]
+            fields = dict(zip(FIELD_WEIGHTS, row[3:]))
+            docs[projectid] = {
+                "projectid": projectid,
+                "title": fields["title"] or "",
+                "leader": fields["leader"] or "",
+                "projectlocation": fields["projectlocation"] or "",
+                "collegecampus": fields["collegecampus"] or "",
+                "lat": lat,
+                "lng": lng,
+            }
+            for field, weight in FIELD_WEIGHTS.items():
+                for term in set(tokenize(fields[field])):
+                    doc_weights = postings[term]
+                    doc_weights[projectid] = doc_weights.get(projectid, 0.0) + weight
+
+        with self._lock:
+            if _is_current(self.version, version):
+                return  # a build from newer data finished first
+            self._postings = dict(postings)
+            self._terms = sorted(postings)
+            self._docs = docs
+            self.version = version
+
+    def ensure_current(self, version, load_rows):
+        """Rebuild from ``load_rows()`` unless the index is already at ``version``."""
+        if _is_current(self.version, version):
+            return
+        with self._build_lock:
+            if _is_current(self.version, version):
+                return
+            self.build(load_rows(), version)
+
+    def _matches(self, word):
+        # Documents matching one query word, as {projectid: score}
+        start = bisect.bisect_left(self._terms, word)
+        scores = defaultdict(float)
+        for term in self._terms[start : start + MAX_PREFIX_TERMS]:
+            if not term.startswith(word):
+                break
+            factor = 1.0 if term == word else PREFIX_FACTOR
+            for projectid, weight in self._postings[term].items():
+                scores[projectid] += weight * factor
+        return scores
+
+    def search(self, query, limit=DEFAULT_LIMIT):
+        words = tokenize(query)
+        if not words:
+            return []
+
+        with self._lock:
+            totals = None
+            for word in words:
+                scores = self._matches(word)
+                if totals is None:
+                    totals = scores
+                else:
+                    totals = {
+                        projectid: total + scores[projectid]
+                        for projectid, total in totals.items()
+                        if projectid in scores
+                    }
+                if not totals:
+                    return []
+
+            best = heapq.nlargest(
+                limit,
+                totals.items(),
+                key=lambda item: (item[1], -item[0]),
+            )
+            return [
+                dict(self._docs[projectid], score=round(score, 3))
+                for projectid, score in best
+            ]
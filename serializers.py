@@ -0,0 +1,70 @@
+"""
+Turning dbo.Projects rows into the JSON objects the pages expect.
+
+Build a ``RowSerializer`` once per result set (from ``cursor.description``)
+and call it per row: the key list and value conversion are worked out up
+front, so each row is a single ``dict(zip(...))`` with no per-key branching.
+
+- dates become "YYYY-MM-DD" and NULLs become "" (the templates print values
+  as-is, so null would show up as "null")
+- the map format also turns numbers into strings, renames x/y to lng/lat and
+  points ``link`` at the PDF under /attachments/
+"""
+
+from datetime import date
+from decimal import Decimal
+
+PDF_PREFIX = "/attachments/"
+
+# Column renames shared by every format
+RENAMES = {"sdg_list": "sdg"}
+LOCATION_RENAMES = dict(RENAMES, x="lng", y="lat")
+
+
+def _value(value):
+    if value is None:
+        return ""
+    if isinstance(value, date):  # also datetime
+        return value.strftime("%Y-%m-%d")
+    return value
+
+
+def _text(value):
+    if value is None:
+        return ""
+    if isinstance(value, date):
+        return value.strftime("%Y-%m-%d")
+    if isinstance(value, (int, float, Decimal)):
+        return str(value)
+    return value
+
+
+class RowSerializer:
+    def __init__(
+        self, columns, renames=RENAMES, numbers_as_text=False, pdf_links=False
+    ):
+        keys = [renames.get(column, column) for column in columns]
+        # sdg_list replaces the legacy sdg column when a query selects both
+        if "sdg_list" in columns and "sdg" in columns:
+            keys[columns.index("sdg")] = None
+        self.keys = keys
+        self.convert = _text if numbers_as_text else _value
+        self.pdf_links = pdf_links and "link" in keys
+
+    @classmethod
+    def for_cursor(cls, cursor, **options):
+        return cls([column[0] for column in cursor.description], **options)
+
+    def __call__(self, row):
+        project = dict(zip(self.keys, map(self.convert, row)))
+        project.pop(None, None)
+        if self.pdf_links and project["link"]:
+            project["link"] = PDF_PREFIX + project["link"]
+        return project
+
+
+def location_serializer(columns):
+    """Serializer for the map's project objects (see /api/projects)."""
+    return RowSerializer(
+        columns, renames=LOCATION_RENAMES, numbers_as_text=True, pdf_links=True
+    )
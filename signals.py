@@ -0,0 +1,12 @@
+"""
+Signals fired by the write endpoints.
+
+Caches and other listeners subscribe with ``@projects_changed.connect`` and get
+``projectid`` and ``action`` ("add", "edit" or "delete") as keyword arguments.
+"""
+
+from blinker import Namespace
+
+_signals = Namespace()
+
+projects_changed = _signals.signal("projects-changed")
@@ -0,0 +1,78 @@
+"""
+Viewport queries for the map markers.
+
+The map asks for the projects inside its current bounds. Zoomed out, points are
+grouped into a grid in SQL (cells about a quarter of a 256px tile wide) so the
+browser draws one circle per cell instead of thousands of markers; zoomed in,
+the individual projects come back. Both queries are range scans on the
+IX_Projects_y_x index (migration 0003).
+"""
+
+# At this zoom and above individual markers are returned instead of clusters
+CLUSTER_BELOW_ZOOM = 13
+# Leaflet's zoom range; anything outside it is a bad request
+MIN_ZOOM = 0
+MAX_ZOOM = 22
+CELLS_PER_TILE = 4
+MAX_MARKERS = 2000
+
+_IN_BOUNDS = """
+    x IS NOT NULL AND y IS NOT NULL
+    AND y BETWEEN ? AND ? AND x BETWEEN ? AND ?
+"""
+
+CLUSTER_QUERY = f"""
+SELECT COUNT(*), AVG(CAST(y AS FLOAT)), AVG(CAST(x AS FLOAT)), MIN(projectid), MIN(title)
+FROM dbo.Projects
+WHERE {_IN_BOUNDS}
+GROUP BY FLOOR(y / ?), FLOOR(x / ?)
+"""
+
+MARKER_QUERY = f"""
+SELECT TOP (?) 1, y, x, projectid, title
+FROM dbo.Projects
+WHERE {_IN_BOUNDS}
+ORDER BY projectid
+"""
+
+
+def cell_size(zoom):
+    """Grid cell edge in degrees for ``zoom``."""
+    return 360.0 / (2**zoom) / CELLS_PER_TILE
+
+
+def viewport(cursor, west, south, east, north, zoom):
+    """
+    Return the projects inside the box as parallel arrays.
+
+    Every entry has ``count``; single projects also carry their ``ids`` and
+    ``title`` (clusters of more than one get ``None`` and ``""``).
+    """
+    bounds = [min(south, north), max(south, north), min(west, east), max(west, east)]
+    clustered = zoom < CLUSTER_BELOW_ZOOM
+
+    if clustered:
+        size = cell_size(zoom)
+        cursor.execute(CLUSTER_QUERY, bounds + [size, size])
+    else:
+        cursor.execute(MARKER_QUERY, [MAX_MARKERS] + bounds)
+
+    result = {
+        "zoom": zoom,
+        "clustered": clustered,
+        "ids": [],
+        "lat": [],
+        "lng": [],
+        "title": [],
+        "count": [],
+    }
+    for count, lat, lng, projectid, title in cursor.fetchall():
+        single = count == 1
+        result["ids"].append(projectid if single else None)
+        result["lat"].append(float(lat))
+        result["lng"].append(float(lng))
+        result["title"].append((title or "") if single else "")
+        result["count"].append(count)
+
+    result["truncated"] = not clustered and len(result["ids"]) == MAX_MARKERS
+    return result
@@ -0,0 +1,33 @@
+// Live project changes from /events (see events.py).
+//
+// subscribeToChanges(onChanges) calls onChanges(changes) with the add, edit
+// and delete events of a burst, coalesced into one call per `delay` ms, or
+// with null when the page should refetch everything ("import", or a "resync"
+// after a gap). EventSource reconnects by itself and resumes after the last
+// event id it saw.
+function subscribeToChanges(onChanges, delay = 500) {
+  let timer = null;
+  let pending = [];
+
+  function flush() {
+    timer = null;
+    const changes = pending;
+    pending = [];
+    onChanges(changes.includes(null) ? null : changes);
+  }
+
+  function queue(change) {
+    pending.push(change);
+    if (timer === null) {
+      timer = setTimeout(flush, delay);
+    }
+  }
+
+  const source = new EventSource("/events");
+  for (const action of ["add", "edit", "delete"]) {
+    source.addEventListener(action, (event) => queue(JSON.parse(event.data)));
+  }
+  source.addEventListener("import", () => queue(null));
+  source.addEventListener("resync", () => queue(null));
+  return source;
+}
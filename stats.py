@@ -0,0 +1,68 @@
+"""
+Dashboard statistics.
+
+The per-SDG, status, campus and year rollups are kept in dbo.DashboardSummary
+(see summary.py), so rendering a dashboard reads a few dozen pre-aggregated
+rows however big dbo.Projects gets.
+"""
+
+from collections import defaultdict
+
+import summary
+
+SDG_NUMBERS = range(1, 18)
+START_YEAR = 2020
+
+
+def empty_sdg_stats():
+    return {i: {"completed": 0, "in_progress": 0} for i in SDG_NUMBERS}
+
+
+def build_context(rows):
+    """
+    Shape (bucket, bucket_key, status, total) rows into the variables that
+    dashboard.html/dashboard2.html expect.
+    """
+    sdg_stats = empty_sdg_stats()
+    status_counts = defaultdict(int)
+    campus_counts = defaultdict(int)
+    year_counts = defaultdict(int)
+
+    for bucket, key, status, total in rows:
+        if bucket == "status":
+            status_counts[status] += total
+        elif bucket == "sdg":
+            sdg_number = int(key)
+            if sdg_number not in sdg_stats:
+                continue
+            if status == "Completed":
+                sdg_stats[sdg_number]["completed"] += total
+            elif status == "In Progress":
+                sdg_stats[sdg_number]["in_progress"] += total
+        elif bucket == "campus":
+            campus_counts[key] += total
+        elif bucket == "year":
+            year_counts[int(key)] += total
+
+    completed_count = status_counts["Completed"]
+    in_progress_count = status_counts["In Progress"]
+
+    campus_labels = sorted(campus_counts)
+    end_year = max(year_counts.keys(), default=START_YEAR)
+    years = list(range(START_YEAR, end_year + 1))
+
+    return {
+        "sdg_stats": sdg_stats,
+        "total_projects": completed_count + in_progress_count,
+        "completed_count": completed_count,
+        "in_progress_count": in_progress_count,
+        "collegecampus_labels": campus_labels,
+        "collegecampus_data": [campus_counts[campus] for campus in campus_labels],
+        "years": years,
+        "program_counts": [year_counts.get(year, 0) for year in years],
+    }
+
+
+def dashboard_stats(cursor):
+    """Read the materialized summary on ``cursor`` and return the template context."""
+    return build_context(summary.read(cursor))
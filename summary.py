@@ -0,0 +1,88 @@
+"""
+Incremental maintenance of dbo.DashboardSummary.
+
+The summary holds one running total per (bucket, key, status), where bucket is
+one of ``status``, ``sdg``, ``campus`` or ``year``. Write endpoints subtract a
+project's old contribution before changing it and add the new contribution
+afterwards, inside the same transaction, so the dashboards only ever read the
+small summary table. ``rebuild()`` recomputes everything to recover from drift.
+"""
+
+import versions
+
+# Adds (sign=1) or removes (sign=-1) the contribution of the selected projects
+_APPLY = """
+MERGE dbo.DashboardSummary WITH (HOLDLOCK) AS s
+USING (
+    SELECT bucket, bucket_key, status, COUNT(*) * ? AS delta
+    FROM dbo.ProjectSummaryContrib
+    WHERE {projects}
+    GROUP BY bucket, bucket_key, status
+) AS c
+ON s.bucket = c.bucket AND s.bucket_key = c.bucket_key AND s.status = c.status
+WHEN MATCHED AND s.total + c.delta <= 0 THEN DELETE
+WHEN MATCHED THEN UPDATE SET total = s.total + c.delta
+WHEN NOT MATCHED AND c.delta > 0 THEN
+    INSERT (bucket, bucket_key, status, total)
+    VALUES (c.bucket, c.bucket_key, c.status, c.delta);
+"""
+
+APPLY_CONTRIBUTION = _APPLY.format(projects="projectid = ?")
+APPLY_RANGE_CONTRIBUTION = _APPLY.format(projects="projectid BETWEEN ? AND ?")
+
+
+def add_project(cursor, projectid):
+    """Count ``projectid`` as it is now. Call after INSERT/UPDATE, before commit."""
+    cursor.execute(APPLY_CONTRIBUTION, (1, projectid))
+
+
+def add_project_range(cursor, first, last):
+    """Count every project with an ID in [first, last], e.g. one import batch."""
+    cursor.execute(APPLY_RANGE_CONTRIBUTION, (1, first, last))
+
+
+def lock_project(cursor, projectid):
+    """
+    Lock the project's row until commit; False if there is no such project.
+    Take it before ``remove_project()``, or two concurrent edits/deletes of the
+    same project both subtract its old counts.
+    """
+    cursor.execute(
+        "SELECT 1 FROM dbo.Projects WITH (UPDLOCK, ROWLOCK) WHERE projectid = ?",
+        projectid,
+    )
+    return cursor.fetchone() is not None
+
+
+def remove_project(cursor, projectid):
+    """Uncount ``projectid`` as it is now. Call before UPDATE/DELETE."""
+    cursor.execute(APPLY_CONTRIBUTION, (-1, projectid))
+
+
+def read(cursor):
+    """Return every summary row as (bucket, bucket_key, status, total)."""
+    cursor.execute("SELECT bucket, bucket_key, status, total FROM dbo.DashboardSummary")
+    return cursor.fetchall()
+
+
+def rebuild(conn):
+    """Recompute the whole summary from dbo.Projects. Returns the number of rows."""
+    cursor = conn.cursor()
+    try:
+        cursor.execute("DELETE FROM dbo.DashboardSummary WITH (TABLOCKX)")
+        cursor.execute("""
+            INSERT INTO dbo.DashboardSummary (bucket, bucket_key, status, total)
+            SELECT bucket, bucket_key, status, COUNT(*)
+            FROM dbo.ProjectSummaryContrib
+            GROUP BY bucket, bucket_key, status
+        """)
+        rows = cursor.rowcount
+        # Invalidates the dashboard caches and ETags keyed on the version
+        versions.bump(cursor, "Projects")
+        conn.commit()
+    except Exception:
+        conn.rollback()
+        raise
+    finally:
+        cursor.close()
+    return rows
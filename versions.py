@@ -0,0 +1,32 @@
+"""
+Per-table data versions kept in dbo.TableVersions.
+
+Write endpoints call ``bump()`` inside their transaction; readers use
+``current()`` to build ETags and cache keys that stay valid across every
+gunicorn worker, not just the one that handled the write.
+"""
+
+
+def current(cursor, table):
+    cursor.execute("SELECT version FROM dbo.TableVersions WHERE table_name = ?", table)
+    row = cursor.fetchone()
+    return row[0] if row else 0
+
+
+def all_current(cursor):
+    """{table_name: version} for every row of dbo.TableVersions."""
+    cursor.execute("SELECT table_name, version FROM dbo.TableVersions")
+    return {table: version for table, version in cursor.fetchall()}
+
+
+def bump(cursor, table):
+    """Increment ``table``'s version and return the new value."""
+    return cursor.execute(
+        """
+        UPDATE dbo.TableVersions
+        SET version = version + 1, updated_at = SYSUTCDATETIME()
+        OUTPUT INSERTED.version
+        WHERE table_name = ?
+        """,
+        table,
+    ).fetchval()